@@ -1,28 +1,348 @@
 DATA_FILE = 'data/Primärverbrauch PL.json'
+# data file of every country, the loader is picked by the file extension
+COUNTRY_FILES = {
+    "de": 'data/Primärverbrauch DE.csv',
+    "fr": 'data/Primärverbrauch FR.json',
+    "gb": 'data/Primärverbrauch GB.db',
+    "pl": DATA_FILE,
+}
+DEFAULT_COUNTRY = "pl"
+RELOAD_INTERVAL = 5  # seconds between checks of the data files for changes
+import os
 import json
-from fastapi import FastAPI, Query
-from fastapi.responses import HTMLResponse
-from typing import List, Dict, Any
+import asyncio
+import sqlite3
+import gzip
+import hashlib
+import math
+import numpy as np
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel  # Make sure 'pydantic' is installed: pip install pydantic
 import requests
 
-# Load data from file
-try:
-    with open(DATA_FILE, encoding='utf-8') as file:
-        try:
-            data = json.load(file)
-            # Check if data is a dictionary with years as keys
-            if not isinstance(data, dict):
-                print("Data is not a dictionary.")
-                data = {}
-        except json.JSONDecodeError:
-            print("Could not parse data from file.")
-            exit(1)
-except FileNotFoundError:
-    print("File not found.")
+import energy_pipeline
+
+# read the data file once and derive the data version from its content, used for the ETag
+def read_data_file(path):
+    with open(path, 'rb') as file:
+        raw_bytes = file.read()
+    return raw_bytes, hashlib.sha256(raw_bytes).hexdigest()
+
+
+
+# values are coerced like pd.to_numeric(errors='coerce').fillna(0) in energy_pipeline: everything that is not a finite number counts as 0
+def to_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if math.isfinite(number) else 0.0
+
+
+#---------Indexed year store---------
+class YearStore:
+    """Year keys sorted once at startup, year ranges are found by binary search and sliced by position."""
+
+    def __init__(self, raw_data, version=""):
+        self.version = version
+        items = []
+        for year, values in raw_data.items():
+            try:
+                items.append((int(year), year, values))
+            except (TypeError, ValueError):
+                print(f"Skipping invalid year key: {year}")
+        items.sort(key=lambda item: item[0])
+        self.years = [item[0] for item in items]
+        self.keys = [item[1] for item in items]
+        self.values = [item[2] for item in items]
+        self.build_columns()
+
+    def build_columns(self):
+        """Copy the values into a NumPy matrix (years x sources) and precompute the aggregations."""
+        self.sources = []
+        column = {}
+        for values in self.values:
+            for source in values:
+                if source not in column:
+                    column[source] = len(self.sources)
+                    self.sources.append(source)
+        self.year_array = np.array(self.years, dtype=np.int64)
+        self.matrix = np.zeros((len(self.values), len(self.sources)), dtype=np.float64)
+        for row, values in enumerate(self.values):
+            for source, value in values.items():
+                self.matrix[row, column[source]] = to_number(value)
+        # percentage share of every source per year, years without consumption get 0
+        totals = self.matrix.sum(axis=1, keepdims=True)
+        self.shares = np.divide(self.matrix * 100, totals, out=np.zeros_like(self.matrix), where=totals > 0)
+        # row i holds the change from year i to year i + 1
+        self.deltas = np.diff(self.matrix, axis=0)
+        self.statistics = self.compute_statistics(0, len(self.years))
+
+    def compute_statistics(self, start, end):
+        """Return max/mean/min per source for the years between two positions."""
+        block = self.matrix[start:end]
+        if not len(block):
+            return {}
+        years = self.year_array[start:end]
+        maxima, means, minima = block.max(axis=0), block.mean(axis=0), block.min(axis=0)
+        max_years, min_years = years[block.argmax(axis=0)], years[block.argmin(axis=0)]
+        return {
+            source: {
+                "max": float(maxima[col]),
+                "max_year": int(max_years[col]),
+                "mean": float(means[col]),
+                "min": float(minima[col]),
+                "min_year": int(min_years[col]),
+            }
+            for col, source in enumerate(self.sources)
+        }
+
+    def statistics_between(self, start, end):
+        if start == 0 and end == len(self.years):
+            return self.statistics
+        return self.compute_statistics(start, end)
+
+    def shares_between(self, start, end):
+        rows = np.round(self.shares[start:end], 2).tolist()
+        return {key: dict(zip(self.sources, row)) for key, row in zip(self.keys[start:end], rows)}
+
+    def deltas_between(self, start, end):
+        # the first year of the whole series has no previous year
+        start = max(start, 1)
+        if end <= start:
+            return {}
+        rows = self.deltas[start - 1:end - 1].tolist()
+        return {key: dict(zip(self.sources, row)) for key, row in zip(self.keys[start:end], rows)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def bounds(self, from_year=None, to_year=None):
+        """Return the (start, end) positions of a year range via binary search."""
+        start = bisect_left(self.years, from_year) if from_year is not None else 0
+        end = bisect_right(self.years, to_year) if to_year is not None else len(self.years)
+        return start, max(start, end)
+
+    def after(self, year):
+        """Return the position of the first year after the given one (keyset cursor)."""
+        return bisect_right(self.years, year)
+
+    def slice(self, start, end):
+        """Return the years between two positions, costs O(end - start)."""
+        return {self.keys[pos]: self.values[pos] for pos in range(start, end)}
+
+
+#---------Loader plugins---------
+# every loader turns one file format into {year: {energy_source: value}}
+LOADERS = {}
+
+
+def loader(*extensions):
+    """Register a loader function for the given file extensions."""
+    def register(func):
+        for extension in extensions:
+            LOADERS[extension] = func
+        return func
+    return register
+
+
+@loader(".json")
+def load_json(path, raw_bytes):
+    data = json.loads(raw_bytes.decode('utf-8'))
+    # Check if data is a dictionary with years as keys
+    if not isinstance(data, dict):
+        raise ValueError("Data is not a dictionary.")
+    return data
+
+
+# the GUI loaders of energy_pipeline, so the API and the GUI read and coerce CSV and SQLite files the same way
+def frame_to_data(df):
+    sources = [str(column) for column in df.columns[1:]]
+    columns = [df[column].tolist() for column in df.columns[1:]]
+    return {str(year): dict(zip(sources, values)) for year, *values in zip(df["Jahr"].tolist(), *columns)}
+
+
+@loader(".csv")
+def load_csv(path, raw_bytes):
+    # security check, encoding detection and parsing, a finding raises energy_pipeline.SecurityCheckError (a ValueError)
+    return frame_to_data(energy_pipeline.load_csv_bytes(path, raw_bytes))
+
+
+@loader(".db", ".sqlite")
+def load_sqlite(path, raw_bytes):
+    # read-only connection, years and values converted to integers by SQLite
+    return frame_to_data(energy_pipeline.load_sqlite(path))
+
+
+# parse and validate a data file, runs in a worker thread and never touches the live stores
+def build_store(path, current_version=None):
+    raw_bytes, version = read_data_file(path)
+    if version == current_version:
+        return None
+    file_loader = LOADERS.get(os.path.splitext(path)[1].lower())
+    if file_loader is None:
+        raise ValueError(f"No loader for the file format of '{path}'.")
+    new_data = file_loader(path, raw_bytes)
+    for year, values in new_data.items():
+        if not isinstance(values, dict):
+            raise ValueError(f"Values for year {year} are not a dictionary.")
+    new_store = YearStore(new_data, version)
+    if not len(new_store):
+        raise ValueError("Data contains no valid years.")
+    return new_store
+
+
+# Load data from files
+stores = {}
+for country, path in COUNTRY_FILES.items():
+    try:
+        stores[country] = build_store(path)
+    except FileNotFoundError:
+        print(f"File not found: {path}")
+    except (ValueError, UnicodeDecodeError, sqlite3.Error) as e:
+        print(f"Could not parse data from file {path}: {e}")
+if DEFAULT_COUNTRY not in stores:
     exit(1)
 
 
+# get the current store of a country, one snapshot per request
+def get_store(country):
+    current = stores.get(country.lower())
+    if current is None:
+        raise HTTPException(status_code=404, detail=f"Unknown country '{country}'. Available: {', '.join(stores)}")
+    return current
+
+
+#---------Hot reload of the data files---------
+# replace a store with one assignment, so readers see either the old or the new data
+def swap_store(country, new_store):
+    stores[country] = new_store
+    # everything derived from the old data is invalid now
+    response_cache.clear()
+
+
+async def watch_data_files():
+    last_stats = {}
+    while True:
+        await asyncio.sleep(RELOAD_INTERVAL)
+        for country, path in COUNTRY_FILES.items():
+            try:
+                stat = os.stat(path)
+                current_stat = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                current_stat = None
+            if current_stat == last_stats.get(country):
+                continue
+            # a failed reload is only retried and reported again once the file changes again
+            last_stats[country] = current_stat
+            try:
+                if current_stat is None:
+                    raise FileNotFoundError(f"File not found: {path}")
+                # mtime or size changed, the content hash decides whether the data really changed
+                current = stores.get(country)
+                new_store = await asyncio.to_thread(build_store, path, current.version if current else None)
+                if new_store is not None:
+                    swap_store(country, new_store)
+                    print(f"Reloaded {path} with {len(new_store)} years.")
+            except Exception as e:
+                print(f"Could not reload {path}, keeping the current data: {e}")
+
+
+#---------Rendered response cache---------
+CachedBody = namedtuple("CachedBody", ["body", "gzip_body", "etag"])
+
+
+class ResponseCache:
+    """LRU cache of fully rendered response bodies, bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        if key in self.entries:
+            self.size -= self.entry_size(self.entries.pop(key))
+        self.entries[key] = entry
+        self.size += self.entry_size(entry)
+        # evict least recently used bodies until the cache fits again
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= self.entry_size(evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    @staticmethod
+    def entry_size(entry):
+        return len(entry.body) + len(entry.gzip_body)
+
+
+response_cache = ResponseCache()
+
+
+# serialize a payload once, the same way FastAPI's JSONResponse would
+def render_body(key, payload):
+    body = json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    # the key starts with the data version, so the ETag changes whenever the data does
+    tag = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32]
+    return CachedBody(body, gzip.compress(body, compresslevel=6), f'"{tag}"')
+
+
+# look up a rendered body or render and store it
+def respond_cached(request, key, build):
+    entry = response_cache.get(key)
+    if entry is None:
+        entry = render_body(key, build())
+        response_cache.put(key, entry)
+    return cached_response(request, entry)
+
+
+# the gzip body is another representation, so it gets its own strong ETag
+def gzip_etag(etag):
+    return etag[:-1] + '-gz"'
+
+
+# answer from the cache, with 304 for a matching ETag and gzip if the client accepts it
+def cached_response(request, entry):
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "") and len(entry.gzip_body) < len(entry.body)
+    etag = gzip_etag(entry.etag) if use_gzip else entry.etag
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    # a client may still hold the tag of the other representation, the data behind both is the same
+    known_tags = {entry.etag, gzip_etag(entry.etag)}
+    if known_tags.intersection(tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# run the file watcher together with the server, the reference keeps the task from being garbage collected
+@asynccontextmanager
+async def lifespan(app):
+    watcher = asyncio.create_task(watch_data_files())
+    try:
+        yield
+    finally:
+        watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await watcher
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Primary Energy Consumption API",
@@ -31,35 +351,234 @@ app = FastAPI(
     contact={"name": "Benedikt Krings",
              "url": "http://localhost:8000/api/1/primary_energy_consumption",
              "email": "bkkrings@root.de"},
-    last_updated="2025-05-25"
+    last_updated="2025-05-25",
+    lifespan=lifespan
 )
 
 
-# Define route for data retrieval
-@app.get("/api/1/primary_energy_consumption")
-async def get_primary_energy_consumption(
-    page: int = Query(1, alias='page', description="Page number"),
-    limit: int = Query(20, alias='limit', description="Number of items per page")
-):
-    """Get primary energy consumption data."""    
-    total_data = len(data)
-    start = (page - 1) * limit
-    end = start + limit
-    items = {year: data[year] for year in list(data)[start:end]}
-    
+# build the query string for next/previous links
+def page_url(path, page, limit, from_year=None, to_year=None, after_year=None):
+    if after_year is not None:
+        url = f"{path}?after_year={after_year}&limit={limit}"
+    else:
+        url = f"{path}?page={page}&limit={limit}"
+    if from_year is not None:
+        url += f"&from_year={from_year}"
+    if to_year is not None:
+        url += f"&to_year={to_year}"
+    return url
+
+
+# build one page of data with its pagination info
+def render_page(current, path, page, limit, from_year=None, to_year=None, after_year=None):
+    first, last = current.bounds(from_year, to_year)
+    total_data = last - first
+    if after_year is not None:
+        # keyset pagination: the cursor is found by binary search, so deep pages cost the same as the first
+        start = min(max(first, current.after(after_year)), last)
+        end = min(start + limit, last)
+        next_url = page_url(path, None, limit, from_year, to_year, current.years[end - 1]) if end < last else None
+        previous_url = None
+        page = None
+    else:
+        start = min(first + (page - 1) * limit, last)
+        end = min(start + limit, last)
+        next_url = page_url(path, page + 1, limit, from_year, to_year) if end < last else None
+        previous_url = page_url(path, page - 1, limit, from_year, to_year) if page > 1 else None
+    items = current.slice(start, end)
+
     return {
         "info": {
             "page": page,
             "limit": limit,
             "total": total_data,
             "pages": (total_data + limit - 1) // limit,  # rounds up
-            "next": f"/api/1/primary_energy_consumption?page={page + 1}&limit={limit}" if end < total_data else None,
-            "previous": f"/api/1/primary_energy_consumption?page={page - 1}&limit={limit}" if page > 1 else None
+            "next": next_url,
+            "previous": previous_url
         },
         "data": items
     }
 
 
+# Define route for data retrieval, the route without country serves the default country
+@app.get("/api/1/primary_energy_consumption")
+@app.get("/api/1/{country}/primary_energy_consumption")
+async def get_primary_energy_consumption(
+    request: Request,
+    country: str = DEFAULT_COUNTRY,
+    page: int = Query(1, alias='page', ge=1, description="Page number"),
+    limit: int = Query(20, alias='limit', ge=1, description="Number of items per page"),
+    from_year: Optional[int] = Query(None, description="First year to include"),
+    to_year: Optional[int] = Query(None, description="Last year to include"),
+    after_year: Optional[int] = Query(None, description="Cursor: return the years after this one instead of a page")
+):
+    """Get primary energy consumption data."""
+    # one snapshot of the store for the whole request
+    current = get_store(country)
+    path = request.url.path
+    if after_year is not None:
+        page = 1  # the cursor replaces the page offset
+    key = (current.version, path, page, limit, from_year, to_year, after_year)
+    return respond_cached(request, key, lambda: render_page(current, path, page, limit, from_year, to_year, after_year))
+
+
+# yield the years as NDJSON lines, a few hundred lines per chunk
+def iter_ndjson(current, start, end, chunk_size=256):
+    for chunk_start in range(start, end, chunk_size):
+        lines = []
+        for pos in range(chunk_start, min(chunk_start + chunk_size, end)):
+            line = {"year": current.keys[pos], "data": current.values[pos]}
+            lines.append(json.dumps(line, ensure_ascii=False, separators=(",", ":")))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# Define route for the streaming export of all years
+@app.get("/api/1/primary_energy_consumption/export")
+@app.get("/api/1/{country}/primary_energy_consumption/export")
+async def export_primary_energy_consumption(
+    country: str = DEFAULT_COUNTRY,
+    from_year: Optional[int] = Query(None, description="First year to include"),
+    to_year: Optional[int] = Query(None, description="Last year to include")
+):
+    """Stream the whole series as NDJSON, one year per line."""
+    current = get_store(country)
+    start, end = current.bounds(from_year, to_year)
+    return StreamingResponse(
+        iter_ndjson(current, start, end),
+        media_type="application/x-ndjson",
+        headers={"ETag": f'"{current.version[:32]}"'}
+    )
+
+
+# Define routes for server-side aggregations
+@app.get("/api/1/primary_energy_consumption/statistics")
+@app.get("/api/1/{country}/primary_energy_consumption/statistics")
+async def get_primary_energy_statistics(
+    request: Request,
+    country: str = DEFAULT_COUNTRY,
+    from_year: Optional[int] = Query(None, description="First year to include"),
+    to_year: Optional[int] = Query(None, description="Last year to include")
+):
+    """Get max, mean and min consumption per energy source."""
+    current = get_store(country)
+    start, end = current.bounds(from_year, to_year)
+    key = (current.version, "statistics", from_year, to_year)
+    return respond_cached(request, key, lambda: {
+        "years": end - start,
+        "data": current.statistics_between(start, end)
+    })
+
+
+@app.get("/api/1/primary_energy_consumption/shares")
+@app.get("/api/1/{country}/primary_energy_consumption/shares")
+async def get_primary_energy_shares(
+    request: Request,
+    country: str = DEFAULT_COUNTRY,
+    from_year: Optional[int] = Query(None, description="First year to include"),
+    to_year: Optional[int] = Query(None, description="Last year to include")
+):
+    """Get the percentage share of every energy source per year."""
+    current = get_store(country)
+    start, end = current.bounds(from_year, to_year)
+    key = (current.version, "shares", from_year, to_year)
+    return respond_cached(request, key, lambda: {"data": current.shares_between(start, end)})
+
+
+@app.get("/api/1/primary_energy_consumption/deltas")
+@app.get("/api/1/{country}/primary_energy_consumption/deltas")
+async def get_primary_energy_deltas(
+    request: Request,
+    country: str = DEFAULT_COUNTRY,
+    from_year: Optional[int] = Query(None, description="First year to include"),
+    to_year: Optional[int] = Query(None, description="Last year to include")
+):
+    """Get the change of every energy source compared to the previous year."""
+    current = get_store(country)
+    start, end = current.bounds(from_year, to_year)
+    key = (current.version, "deltas", from_year, to_year)
+    return respond_cached(request, key, lambda: {"data": current.deltas_between(start, end)})
+
+
+#---------Batch queries---------
+MAX_BATCH_QUERIES = 100
+
+
+class BatchQuery(BaseModel):
+    country: str = DEFAULT_COUNTRY
+    kind: str = "data"  # data, statistics, shares or deltas
+    from_year: Optional[int] = None
+    to_year: Optional[int] = None
+    sources: Optional[List[str]] = None
+
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery]
+
+
+# answer one sub-query from an in-memory store, raises ValueError for invalid queries
+def resolve_query(current, query):
+    start, end = current.bounds(query.from_year, query.to_year)
+    if query.kind == "data":
+        result = current.slice(start, end)
+    elif query.kind == "statistics":
+        result = current.statistics_between(start, end)
+    elif query.kind == "shares":
+        result = current.shares_between(start, end)
+    elif query.kind == "deltas":
+        result = current.deltas_between(start, end)
+    else:
+        raise ValueError(f"Unknown kind '{query.kind}'. Use data, statistics, shares or deltas.")
+    if query.sources is not None:
+        unknown = [source for source in query.sources if source not in current.sources]
+        if unknown:
+            raise ValueError(f"Unknown energy sources: {', '.join(unknown)}")
+        if query.kind == "statistics":
+            # an empty year range has no statistics
+            result = {source: result[source] for source in query.sources if source in result}
+        else:
+            result = {year: {source: values.get(source) for source in query.sources} for year, values in result.items()}
+    return result
+
+
+# Define route for batch queries
+@app.post("/api/1/batch")
+async def batch_query(batch: BatchRequest):
+    """Answer several queries in one round trip, errors are reported per query."""
+    if len(batch.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch.")
+    # countries that are configured but not in memory are loaded concurrently, each one only once
+    missing = sorted({query.country.lower() for query in batch.queries
+                      if query.country.lower() not in stores and query.country.lower() in COUNTRY_FILES})
+    load_errors = {}
+    if missing:
+        loaded = await asyncio.gather(
+            *(asyncio.to_thread(build_store, COUNTRY_FILES[country]) for country in missing),
+            return_exceptions=True
+        )
+        for country, result in zip(missing, loaded):
+            if isinstance(result, Exception):
+                load_errors[country] = f"Could not load data for '{country}': {result}"
+            else:
+                swap_store(country, result)
+    # all sub-queries are resolved against the same snapshot of the stores
+    snapshot = dict(stores)
+    results = []
+    for query in batch.queries:
+        country = query.country.lower()
+        try:
+            current = snapshot.get(country)
+            if current is None:
+                raise ValueError(load_errors.get(country, f"Unknown country '{query.country}'."))
+            results.append({"status": "ok", "data": resolve_query(current, query)})
+        except ValueError as e:
+            results.append({"status": "error", "error": str(e)})
+        except Exception as e:
+            # an unexpected error only fails its own sub-query, never the whole batch
+            print(f"Batch query {query} failed: {e!r}")
+            results.append({"status": "error", "error": f"Internal error: {e}"})
+    return {"results": results}
+
+
 # Define route for API info
 @app.get("/api/1/info", response_model=Dict[str, Any])
 async def get_api_info():
@@ -70,17 +589,24 @@ async def get_api_info():
         "description": "API for primary energy consumption data",
         "author": "Benedikt Krings",
         "last_updated": "2025-05-25",
+        "countries": sorted(stores),
     }
 
 
+# example request against an API that is already running: python api.py --check
+def check_running_api(url="http://localhost:8000/api/1/primary_energy_consumption?page=1&limit=20"):
+    response = requests.get(url)
+    if response.status_code == 200:
+        data = response.json()
+        print(data["data"])  # Hier sind die Energiedaten
+    else:
+        print("Fehler beim Abrufen der Daten:", response.status_code)
+
+
 if __name__ == '__main__':
-    import uvicorn
-    uvicorn.run(app, host='0.0.0.0', port=8000)
-
-url = "http://localhost:8000/api/1/primary_energy_consumption?page=1&limit=20"
-response = requests.get(url)
-if response.status_code == 200:
-    data = response.json()
-    print(data["data"])  # Hier sind die Energiedaten
-else:
-    print("Fehler beim Abrufen der Daten:", response.status_code)
+    import sys
+    if "--check" in sys.argv:
+        check_running_api()
+    else:
+        import uvicorn
+        uvicorn.run(app, host='0.0.0.0', port=8000)
@@ -0,0 +1,115 @@
+# Asynchronous logging for the energiedaten-app.
+# Log lines are put into a queue and written by a background thread with one open file handle,
+# flushed in batches and rotated by size and age of the log file.
+
+import os
+import queue
+import sys
+import threading
+import time
+import datetime
+
+LEVELS = {"[DEBUG]": 10, "[INFO]": 20, "[WARNING]": 30, "[ERROR]": 40}
+
+
+class AsyncLogWriter:
+    def __init__(self, log_path, level="[INFO]", max_bytes=5 * 1024 * 1024, backup_count=5,
+                 rotate_interval=None, flush_interval=1.0, batch_size=200):
+        self.log_path = log_path
+        self.level = LEVELS.get(level, LEVELS["[INFO]"])
+        self.max_bytes = max_bytes  # rotate when the file gets bigger, 0 disables
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval  # rotate after this many seconds, None disables
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.file = None
+        self.started_at = 0  # time of the first record in the current log file
+        self.dropped = 0  # lines lost because the log file could not be written
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    # only puts the line into the queue, never blocks the caller on file I/O
+    def log(self, level, message):
+        if LEVELS.get(level, LEVELS["[ERROR]"]) >= self.level:
+            self.queue.put((time.time(), level, message))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def open_file(self):
+        self.file = open(self.log_path, "a", encoding="utf-8")
+        self.started_at = self.first_record_time()
+
+    # the age of the log file is taken from its first line, so it does not start again with every launch of the app
+    def first_record_time(self):
+        try:
+            with open(self.log_path, encoding="utf-8", errors="replace") as f:
+                first_line = f.readline()
+            return datetime.datetime.strptime(first_line[1:20], "%Y-%m-%d %H:%M:%S").timestamp()
+        except (OSError, ValueError):
+            # empty file or a first line in another format
+            return time.time()
+
+    # energiedaten-app.log -> energiedaten-app.log.1 -> ... -> energiedaten-app.log.<backup_count>
+    def rotate(self):
+        self.file.close()
+        try:
+            for number in range(self.backup_count - 1, 0, -1):
+                source = f"{self.log_path}.{number}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.log_path}.{number + 1}")
+            if self.backup_count > 0:
+                os.replace(self.log_path, f"{self.log_path}.1")
+            else:
+                os.remove(self.log_path)
+        finally:
+            # logging goes on in the old file if it could not be renamed
+            self.open_file()
+
+    def needs_rotation(self):
+        if self.max_bytes and self.file.tell() >= self.max_bytes:
+            return True
+        return self.rotate_interval is not None and time.time() - self.started_at >= self.rotate_interval
+
+    def write_batch(self, batch):
+        for created, level, message in batch:
+            now = datetime.datetime.fromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S")
+            self.file.write(f"[{now}] {level}: {message}\n")
+        self.file.flush()
+        if self.needs_rotation():
+            try:
+                self.rotate()
+            except OSError as e:
+                print(f"Could not rotate '{self.log_path}': {e}", file=sys.stderr)
+
+    # background thread: waits for the first line, then writes everything queued up to batch_size with one flush
+    def run(self):
+        self.open_file()
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while record is not None:
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self.write_batch(batch)
+            except OSError as e:
+                # the log file itself cannot be used, so the loss is reported on stderr
+                self.dropped += len(batch)
+                print(f"Could not write {len(batch)} log lines to '{self.log_path}' ({self.dropped} lost so far): {e}",
+                      file=sys.stderr)
+            if record is None:
+                break
+        self.file.close()
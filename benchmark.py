@@ -0,0 +1,288 @@
+# Benchmark suite of the energiedaten-app: loaders, API and the GUI hot paths on synthetic data.
+#     python benchmark.py --years 1000 10000 100000 --repeat 5 --output benchmark-results.json
+# The data is generated with a fixed seed, so the JSON results of different runs and commits can be compared.
+# The Treeview benchmark needs a display, on a server run it with xvfb-run. It is skipped if Tk cannot start.
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use("Agg")  # headless, before pyplot is imported by charts
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+import charts
+import energy_pipeline
+import synthetic_data
+import table_view
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+RESULT_FORMAT_VERSION = 1
+BENCHMARKS = ("csv", "json", "sqlite", "api", "table", "pie", "line")
+
+
+# seconds of every repetition, the garbage collector runs before each one and is off while measuring
+def measure(func, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return timings
+
+
+def result(benchmark, years, variant, timings, **extra):
+    row = {
+        "benchmark": benchmark,
+        "years": years,
+        "variant": variant,
+        "repeat": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "max": max(timings),
+    }
+    row.update(extra)
+    return row
+
+
+def skipped(benchmark, years, variant, reason):
+    return {"benchmark": benchmark, "years": years, "variant": variant, "skipped": reason}
+
+
+#--------------Loaders-------------
+# the same steps as main.py: energy_pipeline.load_csv scans, detects the encoding and parses the bytes read once
+LOADER_BENCHMARKS = {
+    "csv": ("csv_scan_parse", energy_pipeline.load_csv),
+    "json": ("json_load", energy_pipeline.load_json),
+    "sqlite": ("sqlite_load", energy_pipeline.load_sqlite),
+}
+
+
+def bench_loader(file_format, path, years, variant, repeat):
+    name, loader = LOADER_BENCHMARKS[file_format]
+    return result(name, years, variant, measure(lambda: loader(path), repeat))
+
+
+#--------------API-------------
+# requests go through an in-process ASGI client, no server and no network are involved
+def bench_api(json_path, years, repeat, limit=100):
+    import httpx
+    # api.py reads the data folder relative to the working directory when it is imported, only the import runs there
+    working_dir = os.getcwd()
+    os.chdir(base_path)
+    try:
+        import api
+    finally:
+        os.chdir(working_dir)
+    api.swap_store(api.DEFAULT_COUNTRY, api.build_store(json_path))
+    pages = (years + limit - 1) // limit
+    urls = {
+        "first_page": f"/api/1/{api.DEFAULT_COUNTRY}/primary_energy_consumption?page=1&limit={limit}",
+        "last_page": f"/api/1/{api.DEFAULT_COUNTRY}/primary_energy_consumption?page={pages}&limit={limit}",
+    }
+
+    async def run_requests():
+        rows = []
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name, url in urls.items():
+                # cold: rendered and put into the response cache, warm: answered from the cache
+                for variant, setup in ((f"{name}_cold", api.response_cache.clear), (f"{name}_warm", None)):
+                    timings = []
+                    for _ in range(repeat):
+                        if setup is not None:
+                            setup()
+                        started = time.perf_counter()
+                        response = await client.get(url)
+                        timings.append(time.perf_counter() - started)
+                        response.raise_for_status()
+                    rows.append(result("api_page", years, variant, timings, bytes=len(response.content)))
+        return rows
+
+    return asyncio.run(run_requests())
+
+
+#--------------GUI-------------
+# the DataFrame of the GUI: the year as first column, one column per energy source
+def gui_dataframe(years, seed):
+    year_values, values = synthetic_data.generate_values(years, seed)
+    dataframe = pd.DataFrame(values, columns=synthetic_data.SOURCES)
+    dataframe.insert(0, "Jahr", year_values)
+    return dataframe
+
+
+def bench_table(dataframe, years, repeat):
+    import tkinter as tk
+    from tkinter import ttk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return [skipped("table_fill", years, "treeview", f"Tk could not start: {e}")]
+    try:
+        root.withdraw()
+        tree = ttk.Treeview(root, show="headings", height=10, columns=list(dataframe.columns))
+        scrollbar = ttk.Scrollbar(root, orient="vertical", command=tree.yview)
+        virtual_table = table_view.VirtualTable(tree, scrollbar, int(tree.cget("height")))
+        rows = dataframe.to_numpy()
+        variant = "virtual" if len(rows) >= table_view.VIRTUAL_TABLE_THRESHOLD else "all_rows"
+
+        def fill():
+            table_view.fill_treeview(tree, virtual_table, rows)
+            root.update_idletasks()
+
+        return [result("table_fill", years, variant, measure(fill, repeat))]
+    finally:
+        root.destroy()
+
+
+# the first chart builds the artists, every other year only moves them, Agg renders right away in draw_idle
+def bench_pie(dataframe, years, repeat, switches=50):
+    fig, ax = plt.subplots(figsize=(5, 4))
+    try:
+        renderer = charts.PieChartRenderer(ax, fig.canvas)
+        renderer.reset("benchmark", dataframe)
+        keys = []
+        for position in range(min(switches, len(dataframe))):
+            key = ("benchmark", int(dataframe["Jahr"].iloc[position]))
+            renderer.store(key, dataframe.iloc[position, 1:])
+            keys.append(key)
+
+        def rebuild():
+            renderer.sources = None
+            renderer.show(keys[0])
+
+        def switch_years():
+            for key in keys:
+                renderer.show(key)
+
+        rebuild()
+        return [
+            result("pie_redraw", years, "rebuild", measure(rebuild, repeat)),
+            result("pie_redraw", years, "switch_year", [t / len(keys) for t in measure(switch_years, repeat)], switches=len(keys)),
+        ]
+    finally:
+        plt.close(fig)
+
+
+# all years of one energy source, and a zoom to one tenth and back, downsampled to the axes width each time
+def bench_line(dataframe, years, repeat):
+    fig, ax = plt.subplots(figsize=(6, 4))
+    try:
+        renderer = charts.LineChartRenderer(ax, fig.canvas)
+        source = dataframe.columns[1]
+        first, last = float(dataframe["Jahr"].min()), float(dataframe["Jahr"].max())
+
+        def full_range():
+            renderer.dataframe = None
+            renderer.reset(dataframe)
+            renderer.show([source])
+
+        def zoom():
+            ax.set_xlim(first, first + (last - first) / 10)
+            ax.set_xlim(first, last)
+
+        full_range()
+        return [
+            result("line_chart", years, "full_range", measure(full_range, repeat)),
+            result("line_chart", years, "zoom", [t / 2 for t in measure(zoom, repeat)]),
+        ]
+    finally:
+        plt.close(fig)
+
+
+#--------------Run-------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=base_path, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "commit": git_commit(),
+    }
+
+
+def run(sizes, repeat, benchmarks=BENCHMARKS, errors=True, data_dir=None, seed=synthetic_data.SEED):
+    with tempfile.TemporaryDirectory(prefix="energiedaten-bench-") as temp_dir:
+        formats = [file_format for file_format in synthetic_data.FORMATS if file_format in benchmarks]
+        # the API serves the JSON files
+        if "api" in benchmarks and "json" not in formats:
+            formats.append("json")
+        paths = synthetic_data.generate(os.path.abspath(data_dir or temp_dir), sizes, formats, errors, seed)
+        rows = []
+        for years in sizes:
+            print(f"Benchmarking {years} years ...", file=sys.stderr)
+            for file_format in LOADER_BENCHMARKS:
+                if file_format not in benchmarks:
+                    continue
+                for variant in (("clean", "errors") if errors else ("clean",)):
+                    path = paths[(file_format, years, variant == "errors")]
+                    rows.append(bench_loader(file_format, path, years, variant, repeat))
+            if "api" in benchmarks:
+                rows.extend(bench_api(paths[("json", years, False)], years, repeat))
+            dataframe = gui_dataframe(years, seed)
+            if "table" in benchmarks:
+                rows.extend(bench_table(dataframe, years, repeat))
+            if "pie" in benchmarks:
+                rows.extend(bench_pie(dataframe, years, repeat))
+            if "line" in benchmarks:
+                rows.extend(bench_line(dataframe, years, repeat))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the loaders, the API and the GUI hot paths of the energiedaten-app.")
+    parser.add_argument("--years", nargs="+", type=int, default=[1000, 10000, 100000], help="dataset sizes, 10^3 to 10^7 years")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per benchmark")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--no-errors", action="store_true", help="skip the data variants with faulty values")
+    parser.add_argument("--data-dir", help="keep the generated files in this folder instead of a temporary one")
+    parser.add_argument("--seed", type=int, default=synthetic_data.SEED)
+    parser.add_argument("--output", help="JSON file for the results, printed if not given")
+    args = parser.parse_args(argv)
+    # relative to the folder the benchmark was started in
+    output = os.path.abspath(args.output) if args.output else None
+    report = {
+        "format_version": RESULT_FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {"years": args.years, "repeat": args.repeat, "seed": args.seed, "benchmarks": args.only},
+        "environment": environment(),
+        "results": run(args.years, args.repeat, args.only, not args.no_errors, args.data_dir, args.seed),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Results written to '{output}'.", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
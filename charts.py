@@ -0,0 +1,190 @@
+# Chart renderers of the energiedaten-app, independent of the rest of the GUI.
+# main.py creates them with its matplotlib axes and canvas, benchmark.py runs them headless with the Agg backend.
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+import downsampling
+
+PIE_EXPLODE = 0.01
+PIE_LABEL_DISTANCE = 1.15
+PIE_PCT_DISTANCE = 0.85
+
+
+# keeps the wedge, label and percentage artists and only moves them when another year is selected
+class PieChartRenderer:
+    def __init__(self, axes, figure_canvas):
+        self.ax = axes
+        self.canvas = figure_canvas
+        self.wedges, self.texts, self.autotexts = [], [], []
+        self.sources = None  # energy sources of the current artists, None while "No values" is shown
+        self.dataframes = {}  # country -> DataFrame the cached states of the country were computed from
+        self.states = {}  # (country, year) -> (energy data, chart state), the state is None for years without values
+
+    # the cached states of a country stay valid until another DataFrame is shown for it
+    def reset(self, country, dataframe):
+        if self.dataframes.get(country) is not dataframe:
+            self.dataframes[country] = dataframe
+            self.states = {key: value for key, value in self.states.items() if key[0] != country}
+
+    # angles and label positions with the same geometry as ax.pie(startangle=90, counterclockwise)
+    @staticmethod
+    def compute_state(energy_data):
+        values = energy_data.to_numpy(dtype=float)
+        if (values < 0).any():
+            raise ValueError("Wedge sizes must be non negative values")
+        total = values.sum()
+        if total == 0:
+            return None
+        fractions = values / total
+        theta2 = 0.25 + np.cumsum(fractions)
+        theta1 = theta2 - fractions
+        cos, sin = np.cos(np.pi * (theta1 + theta2)), np.sin(np.pi * (theta1 + theta2))
+        state = []
+        for i, label in enumerate(energy_data.index):
+            center = (PIE_EXPLODE * cos[i], PIE_EXPLODE * sin[i])
+            label_x = center[0] + PIE_LABEL_DISTANCE * cos[i]
+            state.append((
+                center, 360 * theta1[i], 360 * theta2[i],
+                label if values[i] > 0 else '', (label_x, center[1] + PIE_LABEL_DISTANCE * sin[i]),
+                'left' if label_x > 0 else 'right',
+                f'{fractions[i] * 100:.1f}%' if values[i] > 0 else '',
+                (center[0] + PIE_PCT_DISTANCE * cos[i], center[1] + PIE_PCT_DISTANCE * sin[i]),
+            ))
+        return state
+
+    def is_cached(self, key):
+        return key in self.states
+
+    def store(self, key, energy_data):
+        self.states[key] = (energy_data, self.compute_state(energy_data))
+
+    def show(self, key):
+        energy_data, state = self.states[key]
+        sources = tuple(energy_data.index)
+        if state is None or sources != self.sources:
+            self.rebuild(energy_data, state is not None)
+        else:
+            self.apply(state)
+        self.canvas.draw_idle()
+
+    # update the existing artists in place
+    def apply(self, state):
+        for wedge, text, autotext, entry in zip(self.wedges, self.texts, self.autotexts, state):
+            center, theta1, theta2, label, label_xy, label_ha, pct, pct_xy = entry
+            wedge.set_center(center)
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+            text.set_text(label)
+            text.set_position(label_xy)
+            text.set_horizontalalignment(label_ha)
+            autotext.set_text(pct)
+            autotext.set_position(pct_xy)
+
+    # draw all artists new, only needed for the first chart, other energy sources or "No values"
+    def rebuild(self, energy_data, has_values):
+        self.ax.clear()
+        if not has_values:
+            self.ax.pie([1], colors=["lightgrey"])
+            self.ax.text(0, 0, "No values\navailable", ha='center', va='center', fontsize=16, color="red")
+            self.wedges, self.texts, self.autotexts = [], [], []
+            self.sources = None
+            return
+        # Filter out zero values and dont label and display them
+        values = energy_data.values
+        labels = [label if value > 0 else '' for label, value in zip(energy_data.index, values)]
+        colors = plt.cm.tab20.colors
+        # Draw pie chart
+        explode = [PIE_EXPLODE] * len(values)
+        self.wedges, self.texts, self.autotexts = self.ax.pie(
+            values,
+            labels=labels,
+            autopct=lambda pct: f'{pct:.1f}%' if pct > 0 else '',
+            explode=explode,
+            shadow=True,
+            startangle=90,
+            labeldistance=PIE_LABEL_DISTANCE,
+            pctdistance=PIE_PCT_DISTANCE,
+            colors=colors[:len(values)]
+        )
+        for text in self.texts:
+            text.set_fontsize(12)
+        for autotext in self.autotexts:
+            autotext.set_fontsize(11)
+            autotext.set_color("black")
+            autotext.set_bbox(dict(facecolor='white', edgecolor='none', boxstyle='round,pad=0.2', alpha=0.7))
+        self.sources = tuple(energy_data.index)
+
+
+# the lines are downsampled to the pixel width of the axes, zooming and panning only downsample the visible range again
+class LineChartRenderer:
+    def __init__(self, axes, figure_canvas):
+        self.ax = axes
+        self.canvas = figure_canvas
+        self.dataframe = None
+        self.x = None  # years of the dataset, sorted
+        self.series = {}  # energy source -> values as float array
+        self.lines = {}  # energy source -> Line2D, reused while the same sources are shown
+        self.view = None  # (x_min, x_max, pixel width) of the last downsampling
+        self.ax.callbacks.connect("xlim_changed", lambda axes: self.refresh())
+
+    def reset(self, dataframe):
+        if dataframe is self.dataframe:
+            return
+        self.dataframe = dataframe
+        order = np.argsort(dataframe["Jahr"].to_numpy(), kind="stable")
+        self.x = dataframe["Jahr"].to_numpy(dtype=float)[order]
+        self.series = {column: dataframe[column].to_numpy(dtype=float)[order] for column in dataframe.columns[1:]}
+        self.clear_lines()
+
+    def clear_lines(self):
+        for line in self.lines.values():
+            line.remove()
+        self.lines = {}
+        self.view = None
+
+    def show(self, sources):
+        sources = [source for source in sources if source in self.series]
+        if list(self.lines) != sources:
+            self.clear_lines()
+            for source in sources:
+                self.lines[source], = self.ax.plot([], [], label=source, linewidth=1.2)
+            if self.lines:
+                self.ax.legend(loc="upper left", fontsize=8)
+            elif self.ax.get_legend() is not None:
+                self.ax.get_legend().remove()
+        self.reset_view()
+
+    # full range of all shown lines, the y limits stay fixed while zooming along the years
+    def reset_view(self):
+        if not self.lines or len(self.x) == 0:
+            self.canvas.draw_idle()
+            return
+        values = np.concatenate([self.series[source] for source in self.lines])
+        y_min, y_max = float(values.min()), float(values.max())
+        margin = (y_max - y_min) * 0.05 or 1.0
+        self.ax.set_ylim(y_min - margin, y_max + margin)
+        x_min, x_max = float(self.x[0]), float(self.x[-1])
+        if x_min == x_max:
+            x_min, x_max = x_min - 0.5, x_max + 0.5
+        self.view = None
+        # triggers refresh through xlim_changed, refresh is also called if the limits did not change
+        self.ax.set_xlim(x_min, x_max)
+        self.refresh()
+
+    # downsample the visible range to the pixel width, skipped if neither the range nor the width changed
+    def refresh(self):
+        if not self.lines:
+            return
+        x_min, x_max = self.ax.get_xlim()
+        width = max(int(self.ax.bbox.width), 10)
+        if self.view == (x_min, x_max, width):
+            return
+        self.view = (x_min, x_max, width)
+        start, end = downsampling.visible_range(self.x, x_min, x_max)
+        x = self.x[start:end]
+        for source, line in self.lines.items():
+            y = self.series[source][start:end]
+            keep = downsampling.lttb(x, y, width)
+            line.set_data(x[keep], y[keep])
+        self.canvas.draw_idle()
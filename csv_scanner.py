@@ -0,0 +1,143 @@
+# Security scanner for CSV files of the energiedaten-app.
+# All suspicious patterns are compiled into one regular expression, so a file is scanned in a single pass.
+# Very large files are split into chunks at line breaks and scanned in a process pool, scan_file reads them block by block for that.
+
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+SUSPICIOUS_PATTERNS = [
+    r"^=",
+    r"@",
+    r"^@",
+    r"cmd", r"powershell", r"shell", r"WScript",
+    r"WEBSERVICE", r"IMPORTXML", r"IMPORTDATA", r"IMPORTHTML", r"IMPORTRANGE", r"HYPERLINK",
+    r"UNICHAR", r"CHAR", r"CONCATENATE", r"EXEC", r"OPEN", r"INCLUDE",
+    r"WMIC", r"-EX", r"CREATE",
+    r"DROP", r"DELETE", r"ALTER", r"INSERT", r"UPDATE",
+    r"\|",
+    r"\u202e",
+    r"\u202d",
+    r"\u2066", r"\u2067", r"\u2068", r"\u202a", r"\u202b", r"\u202c", r"\u2069",
+]
+UNICODE_CONTROL_CHARS = ['\u202e', '\u202d', '\u2066', '\u2067', '\u2068', '\u202a', '\u202b', '\u202c', '\u2069']
+
+# one alternation of all patterns finds the first suspicious line, MULTILINE keeps "^" at the start of every line
+COMBINED_PATTERN = re.compile("|".join(f"(?:{pattern})" for pattern in SUSPICIOUS_PATTERNS), re.IGNORECASE | re.MULTILINE)
+# the single patterns are only used on a suspicious line to name the pattern, in the same order as before
+COMPILED_PATTERNS = [(pattern, re.compile(pattern, re.IGNORECASE)) for pattern in SUSPICIOUS_PATTERNS]
+
+CHUNK_SIZE = 16 * 1024 * 1024  # bytes per chunk in the parallel mode
+PARALLEL_THRESHOLD = 128 * 1024 * 1024  # files from this size on are scanned in a process pool
+
+
+# name the finding of one line: ("unicode", None), ("pattern", pattern) or None if the line is clean
+def classify_line(line):
+    if any(uc in line for uc in UNICODE_CONTROL_CHARS):
+        return "unicode", None
+    for pattern, compiled in COMPILED_PATTERNS:
+        if compiled.search(line):
+            return "pattern", pattern
+    return None
+
+
+# decode like the former text mode reading: invalid UTF-8 is ignored and all line breaks become "\n"
+def decode(raw_bytes):
+    return raw_bytes.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def scan_text(text):
+    """Return (line number, kind, pattern) of the first suspicious line of a text, or None."""
+    match = COMBINED_PATTERN.search(text)
+    while match:
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        line_end = text.find("\n", match.start())
+        if line_end == -1:
+            line_end = len(text)
+        finding = classify_line(text[line_start:line_end])
+        if finding:
+            return (text.count("\n", 0, line_start) + 1,) + finding
+        match = COMBINED_PATTERN.search(text, line_end)
+    return None
+
+
+# runs in a worker process: scan one chunk and count its lines for the line numbers of later chunks
+def scan_chunk(chunk):
+    text = decode(chunk)
+    return scan_text(text), text.count("\n")
+
+
+# split at line breaks, so no line and no UTF-8 character is cut into two chunks
+def split_chunks(raw_bytes, chunk_size=CHUNK_SIZE):
+    start = 0
+    while start < len(raw_bytes):
+        end = raw_bytes.find(b"\n", min(start + chunk_size, len(raw_bytes)) - 1)
+        end = len(raw_bytes) if end == -1 else end + 1
+        yield raw_bytes[start:end]
+        start = end
+
+
+# read a file in blocks that end at a line break, the rest of a block is kept for the next one
+def read_line_blocks(file_path, chunk_size=CHUNK_SIZE):
+    with open(file_path, "rb") as f:
+        rest = b""
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            block = rest + block
+            end = block.rfind(b"\n") + 1
+            if end == 0:
+                rest = block
+                continue
+            rest = block[end:]
+            yield block[:end]
+        if rest:
+            yield rest
+
+
+def scan_file(file_path, chunk_size=CHUNK_SIZE, parallel=None, max_workers=None):
+    """Like scan_bytes, but reads the file block by block, so it never has to be in memory as a whole."""
+    if parallel is None:
+        parallel = os.path.getsize(file_path) >= PARALLEL_THRESHOLD
+    lines_before = 0
+    if not parallel:
+        for block in read_line_blocks(file_path, chunk_size):
+            finding, line_count = scan_chunk(block)
+            if finding:
+                return (finding[0] + lines_before,) + finding[1:]
+            lines_before += line_count
+        return None
+    workers = max_workers or os.cpu_count() or 1
+    blocks = read_line_blocks(file_path, chunk_size)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            # at most two blocks per worker are read ahead, so the memory use does not grow with the file
+            for block in islice(blocks, 2 * workers - len(pending)):
+                pending.append(executor.submit(scan_chunk, block))
+            if not pending:
+                return None
+            finding, line_count = pending.popleft().result()
+            if finding:
+                executor.shutdown(wait=False, cancel_futures=True)
+                return (finding[0] + lines_before,) + finding[1:]
+            lines_before += line_count
+
+
+def scan_bytes(raw_bytes, parallel=None, max_workers=None):
+    """Return (line number, kind, pattern) of the first suspicious line of a file content, or None."""
+    if parallel is None:
+        parallel = len(raw_bytes) >= PARALLEL_THRESHOLD
+    if not parallel:
+        return scan_text(decode(raw_bytes))
+    lines_before = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for finding, line_count in executor.map(scan_chunk, split_chunks(raw_bytes)):
+            if finding:
+                executor.shutdown(wait=False, cancel_futures=True)
+                return (finding[0] + lines_before,) + finding[1:]
+            lines_before += line_count
+    return None
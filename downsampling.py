@@ -0,0 +1,51 @@
+# Downsampling of long time series for the line chart of the energiedaten-app.
+# A line never needs more points than the axes is wide in pixels, so only the visible range is reduced to about
+# one point per pixel before it is drawn. Only NumPy is needed.
+
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of at most threshold points that keep the shape of the line.
+
+    The first and the last point are always kept. Of every bucket in between the point is chosen that forms the
+    largest triangle with the point chosen in the previous bucket and the mean of the next bucket.
+    """
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # bucket borders of the points between the first and the last one, the last bucket is the last point
+    every = (length - 2) / (threshold - 2)
+    edges = np.minimum(np.floor(np.arange(threshold) * every).astype(np.int64) + 1, length)
+    # the mean of every next bucket is computed once with cumulative sums
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    next_starts = edges[1:-1]
+    next_ends = edges[2:]
+    counts = next_ends - next_starts
+    mean_x = (x_sums[next_ends] - x_sums[next_starts]) / counts
+    mean_y = (y_sums[next_ends] - y_sums[next_starts]) / counts
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        # twice the triangle area, the factor does not change the maximum
+        areas = np.abs((x[previous] - mean_x[bucket]) * (bucket_y - y[previous])
+                       - (x[previous] - bucket_x) * (mean_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def visible_range(x, x_min, x_max):
+    """Start and end index of the points within [x_min, x_max] of sorted x, one point more on each side,
+    so the line does not end before the border of the axes."""
+    start = max(int(np.searchsorted(x, x_min, side="left")) - 1, 0)
+    end = min(int(np.searchsorted(x, x_max, side="right")) + 1, len(x))
+    return start, end
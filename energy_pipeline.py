@@ -0,0 +1,657 @@
+# Loading and analysis pipeline of the energiedaten-app without any GUI dependency.
+# main.py uses these functions for the GUI. Run this file directly for the headless batch mode:
+#     python energy_pipeline.py data --output report.csv --workers 4
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import chardet
+import numpy as np
+import pandas as pd
+
+import csv_scanner
+
+DATA_EXTENSIONS = (".csv", ".json", ".db", ".sqlite")
+STATISTICS_COLUMNS = ["min", "max", "mean", "median", "std", "min_year", "max_year", "cagr"]
+STREAMING_THRESHOLD = 32 * 1024 * 1024  # CSV files from this size on are read row by row, see read_csv_streaming
+
+
+class SecurityCheckError(ValueError):
+    """The CSV file contains potentially malicious content and was not imported."""
+
+    def __init__(self, file_path, finding):
+        super().__init__(describe_finding(file_path, finding)[0])
+        self.file_path = file_path
+        self.finding = finding  # (line number, kind, pattern) of csv_scanner
+
+    # the batch mode passes errors between processes
+    def __reduce__(self):
+        return SecurityCheckError, (self.file_path, self.finding)
+
+
+#--------------Security check-------------
+# log message, window title and window message for a finding of csv_scanner
+def describe_finding(file_path, finding):
+    line_num, kind, pattern = finding
+    if kind == "unicode":
+        return (
+            f"Suspicious Unicode control characters found in line {line_num} of '{file_path}'.",
+            "Critical Security Warning!",
+            f"The CSV file contains suspicious Unicode control characters (e.g. RTL/LTR-Override).\n"
+            f"Import will be aborted. Check the logs."
+        )
+    return (
+        f"Suspicious pattern '{pattern}' found in line {line_num} of '{file_path}'.",
+        "Critical Security Warning!",
+        f"The CSV file contains potentially malicious or dangerous code.\n"
+        f"Import will be aborted.\nDetected pattern: {pattern} Check the logs."
+    )
+
+
+#--------------Loaders-------------
+# automatically detect encoding from the beginning of the file
+def detect_encoding(raw_bytes):
+    result = chardet.detect(raw_bytes[:4096])
+    return result['encoding'] if result['encoding'] else 'utf-8'
+
+
+# semicolon CSV with one energy source per row and one column per year, parsed and normalized to one row per year
+# in two steps, load_csv_bytes times them separately
+def parse_csv_bytes(raw_bytes, encoding):
+    return pd.read_csv(io.BytesIO(raw_bytes), sep=';', encoding=encoding, skip_blank_lines=True)
+
+
+def normalize_csv_frame(raw_df):
+    # remove empty rows
+    raw_df = raw_df.dropna(how='all')
+    df = raw_df.fillna(0)
+    df = df.set_index(raw_df.columns[0]).T.reset_index()
+    df.rename(columns={df.columns[0]: "Jahr"}, inplace=True)
+    df["Jahr"] = pd.to_numeric(df["Jahr"], errors='coerce').fillna(0).astype(int)
+    return df
+
+
+#--------------Streaming CSV ingestion-------------
+# compact dtypes: years as int32, values as int32 as long as every value is a whole number that fits, else float64
+YEAR_DTYPE = np.int32
+INT_VALUE_DTYPE = np.int32
+FLOAT_VALUE_DTYPE = np.float64
+
+
+def is_blank_row(line):
+    return not line.strip("; \t\r\n")
+
+
+# the number of energy sources is needed before the buffer can be allocated, so the rows are counted first
+def count_csv_rows(file_path):
+    with open(file_path, 'rb') as f:
+        return sum(1 for line in f if line.strip(b"; \t\r\n"))
+
+
+# the cells of one energy source as numbers, parsed by the C parser of pandas as a single column
+def parse_row_values(cells, year_count):
+    try:
+        column = pd.read_csv(io.StringIO(cells.replace(";", "\n")), sep=";", header=None, names=["value"],
+                             skip_blank_lines=False).iloc[:, 0]
+    except pd.errors.EmptyDataError:
+        column = pd.Series([], dtype=float)
+    if column.dtype.kind not in "iuf":
+        column = pd.to_numeric(column, errors='coerce')
+    values = column.to_numpy(dtype=float)
+    # an empty last cell has no line of its own
+    if len(values) > year_count:
+        raise ValueError(f"Expected {year_count} values per energy source, found {len(values)}.")
+    if len(values) < year_count:
+        values = np.concatenate((values, np.full(year_count - len(values), np.nan)))
+    return np.nan_to_num(values, nan=0.0)
+
+
+def fits_int_dtype(values):
+    limits = np.iinfo(INT_VALUE_DTYPE)
+    return bool(np.all(np.floor(values) == values)) and values.min(initial=0) >= limits.min and values.max(initial=0) <= limits.max
+
+
+def read_csv_streaming(file_path, encoding):
+    """Like load_csv_bytes, but one energy source row is parsed at a time and written into a year-major
+    buffer allocated from the header, so the file is never in memory and nothing is transposed.
+
+    Unlike load_csv_bytes, years are int32 and values int32 or float64, and cells are split at every
+    semicolon without CSV quoting, so a quoted cell such as "Stein;kohle" raises ValueError."""
+    row_count = count_csv_rows(file_path)
+    with open(file_path, encoding=encoding) as f:
+        header = f.readline().rstrip("\r\n").split(";")
+        years = pd.to_numeric(pd.Series(header[1:], dtype=object), errors='coerce').fillna(0).to_numpy().astype(YEAR_DTYPE)
+        buffer = np.zeros((len(years), max(row_count - 1, 0)), dtype=INT_VALUE_DTYPE)
+        sources = []
+        for line in f:
+            if is_blank_row(line):
+                continue
+            name, _, cells = line.rstrip("\r\n").partition(";")
+            values = parse_row_values(cells, len(years))
+            # converted once to float as soon as the first value needs it
+            if buffer.dtype != FLOAT_VALUE_DTYPE and not fits_int_dtype(values):
+                buffer = buffer.astype(FLOAT_VALUE_DTYPE)
+            buffer[:, len(sources)] = values
+            sources.append(name)
+    # no copy: the DataFrame keeps the buffer as its only block
+    df = pd.DataFrame(buffer[:, :len(sources)], columns=sources, copy=False)
+    df.insert(0, "Jahr", years)
+    return df
+
+
+# default timer of load_csv, measures nothing
+def no_timer(stage):
+    return contextlib.nullcontext()
+
+
+# the security check runs before parsing, a finding raises SecurityCheckError
+# timer(stage) returns a context manager around every stage, main.py passes StageTimer.measure
+def load_csv(file_path, timer=no_timer):
+    if os.path.getsize(file_path) >= STREAMING_THRESHOLD:
+        # large files are never read as a whole, they are scanned in blocks and parsed row by row
+        with timer("security scan"):
+            finding = csv_scanner.scan_file(file_path)
+        if finding is not None:
+            raise SecurityCheckError(file_path, finding)
+        with timer("encoding"):
+            with open(file_path, 'rb') as f:
+                encoding = detect_encoding(f.read(4096))
+        with timer("read_csv streaming"):
+            return read_csv_streaming(file_path, encoding)
+    # the file is read once, the same bytes are used for the security check, encoding detection and parsing
+    with timer("read file"):
+        with open(file_path, 'rb') as f:
+            raw_bytes = f.read()
+    return load_csv_bytes(file_path, raw_bytes, timer)
+
+
+# the in-memory part of load_csv for a file that was already read, api.py uses it with the bytes it hashes
+def load_csv_bytes(file_path, raw_bytes, timer=no_timer):
+    with timer("security scan"):
+        finding = csv_scanner.scan_bytes(raw_bytes)
+    if finding is not None:
+        raise SecurityCheckError(file_path, finding)
+    with timer("encoding"):
+        encoding = detect_encoding(raw_bytes)
+    with timer("read_csv"):
+        raw_df = parse_csv_bytes(raw_bytes, encoding)
+    with timer("normalize"):
+        return normalize_csv_frame(raw_df)
+
+
+def load_json(file_path):
+    raw_data = pd.read_json(file_path)
+    df = pd.DataFrame(raw_data).T.reset_index()
+    df.rename(columns={"index": "Jahr"}, inplace=True)
+    for col in df.columns[1:]:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+#--------------SQLite data access-------------
+SQLITE_TABLE = "energieverbrauch"
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+# the value of a cell as integer in SQL like pd.to_numeric(errors='coerce').fillna(0).astype(int):
+# numbers and numeric text (also with spaces around it) are truncated to integers, NULL, blobs and other text count as 0
+# CAST(... AS NUMERIC) has numeric affinity, so the comparison only converts the text if it is a well-formed number
+def integer_expression(column):
+    column = quote_identifier(column)
+    return (f"CASE WHEN typeof({column}) IN ('integer', 'real') THEN CAST({column} AS INTEGER) "
+            f"WHEN typeof({column}) = 'text' AND CAST(TRIM({column}) AS NUMERIC) = TRIM({column}) "
+            f"THEN CAST(CAST(TRIM({column}) AS NUMERIC) AS INTEGER) ELSE 0 END")
+
+
+# an INTEGER PRIMARY KEY in the first column is the rowid: always an integer, unique, stored sorted and indexed
+def year_is_rowid(table_info):
+    primary_key = [row for row in table_info if row[5]]
+    return len(primary_key) == 1 and primary_key[0][0] == 0 and primary_key[0][2].upper() == "INTEGER"
+
+
+# opt-in maintenance, writes to the file: an index on the integer year, used by the year range and the statistics queries
+# the journal mode is not changed, so the file stays a single file and its mtime and hash still show every change
+def create_year_index(file_path, table=SQLITE_TABLE):
+    conn = sqlite3.connect(file_path)
+    try:
+        table_info = conn.execute(f"PRAGMA table_info({quote_identifier(table)})").fetchall()
+        if not table_info:
+            raise ValueError(f"The table '{table}' does not exist in '{file_path}'.")
+        if year_is_rowid(table_info):
+            return
+        year = table_info[0][1]
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {quote_identifier('idx_' + table + '_' + year + '_int')} "
+                     f"ON {quote_identifier(table)} ({integer_expression(year)})")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# one persistent read-only connection per database file, projection, sorting and aggregates are done by SQLite
+# the reader never writes to the file, see create_year_index for the optional index
+class SQLiteSource:
+    def __init__(self, file_path, table=SQLITE_TABLE):
+        self.file_path = file_path
+        self.table = table
+        self.identity = self.file_identity(file_path)
+        self.conn = sqlite3.connect(Path(file_path).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        # the GUI loads on several worker threads, they share the connection one query at a time
+        self.lock = threading.Lock()
+        table_info = self.query(f"PRAGMA table_info({quote_identifier(table)})")
+        columns = [row[1] for row in table_info]
+        if not columns:
+            self.conn.close()
+            raise ValueError(f"The table '{table}' does not exist in '{file_path}'.")
+        # the first column holds the year
+        self.year_column = columns[0]
+        self.value_columns = columns[1:]
+        # the rowid is sorted and filtered by its own index, other year columns are converted to integers first
+        self.year_is_rowid = year_is_rowid(table_info)
+        self.year = quote_identifier(self.year_column) if self.year_is_rowid else integer_expression(self.year_column)
+
+    @staticmethod
+    def file_identity(file_path):
+        stat = os.stat(file_path)
+        return stat.st_dev, stat.st_ino
+
+    def query(self, sql, parameters=()):
+        with self.lock:
+            return self.conn.execute(sql, parameters).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # years in the stored order that are smaller than the year before and years stored more than once
+    def year_problems(self):
+        # the rowid can neither be unsorted nor hold a year twice
+        if self.year_is_rowid:
+            return False, []
+        year = self.year
+        table = quote_identifier(self.table)
+        unsorted = self.query(f"SELECT EXISTS (SELECT 1 FROM (SELECT {year} AS year, LAG({year}) OVER (ORDER BY rowid) AS previous "
+                              f"FROM {table}) WHERE year < previous)")[0][0]
+        duplicates = [row[0] for row in self.query(f"SELECT {year} FROM {table} GROUP BY {year} HAVING COUNT(*) > 1 ORDER BY {year}")]
+        return bool(unsorted), duplicates
+
+    def frame(self, columns=None, first_year=None, last_year=None):
+        """Return the years and the given value columns (default: all) as DataFrame sorted by year,
+        optionally only from first_year to last_year. Values are converted to integers by SQLite."""
+        columns = self.value_columns if columns is None else list(columns)
+        conditions, parameters = self.year_range(first_year, last_year)
+        selected = ", ".join([f"{self.year} AS Jahr"] +
+                             [f"{integer_expression(column)} AS {quote_identifier(column)}" for column in columns])
+        with self.lock:
+            cursor = self.conn.execute(f"SELECT {selected} FROM {quote_identifier(self.table)}{conditions} "
+                                       f"ORDER BY {self.year}", parameters)
+            rows = cursor.fetchall()
+        df = pd.DataFrame.from_records(rows, columns=["Jahr"] + columns, coerce_float=False)
+        return df.astype(int) if df.empty else df
+
+    def aggregates(self, columns=None, first_year=None, last_year=None):
+        """Return min, max and mean of the given value columns (default: all), one row per energy source."""
+        columns = self.value_columns if columns is None else list(columns)
+        conditions, parameters = self.year_range(first_year, last_year)
+        selected = ", ".join(f"MIN({expression}), MAX({expression}), AVG({expression})"
+                             for expression in map(integer_expression, columns))
+        row = self.query(f"SELECT {selected} FROM {quote_identifier(self.table)}{conditions}", parameters)[0] if columns else ()
+        values = np.array(row, dtype=float).reshape(len(columns), 3)
+        return pd.DataFrame(values, index=columns, columns=["min", "max", "mean"])
+
+    # the same columns as compute_statistics without loading the table, min, max and mean come from aggregates
+    def statistics(self):
+        table = quote_identifier(self.table)
+        year = self.year
+        stats = self.aggregates().reindex(columns=STATISTICS_COLUMNS)
+        count, first_year, last_year = self.query(f"SELECT COUNT(*), MIN({year}), MAX({year}) FROM {table}")[0]
+        if not count:
+            return stats
+        span = last_year - first_year
+        # values of all energy sources in the first and the last year, found through the year index if it was created
+        values = ", ".join(map(integer_expression, self.value_columns))
+        first_row, last_row = (self.query(f"SELECT {values} FROM {table} WHERE {year} = ? LIMIT 1", (edge,))[0]
+                               for edge in (first_year, last_year)) if self.value_columns else ((), ())
+        for position, column in enumerate(self.value_columns):
+            value = integer_expression(column)
+            mean = stats.at[column, "mean"]
+            squares = self.query(f"SELECT SUM(({value} - ?) * ({value} - ?)) FROM {table}", (mean, mean))[0][0]
+            stats.at[column, "std"] = np.sqrt(squares / (count - 1)) if count > 1 else np.nan
+            stats.at[column, "median"] = self.query(f"SELECT AVG(value) FROM (SELECT {value} AS value FROM {table} "
+                                                    f"ORDER BY value LIMIT ? OFFSET ?)", (2 - count % 2, (count - 1) // 2))[0][0]
+            stats.at[column, "min_year"] = self.query(f"SELECT {year} FROM {table} ORDER BY {value}, {year} LIMIT 1")[0][0]
+            stats.at[column, "max_year"] = self.query(f"SELECT {year} FROM {table} ORDER BY {value} DESC, {year} LIMIT 1")[0][0]
+            # compound annual growth rate between the first and the last year
+            first, last = first_row[position], last_row[position]
+            stats.at[column, "cagr"] = (last / first) ** (1 / span) - 1 if first > 0 and last >= 0 and span > 0 else np.nan
+        return stats
+
+    # on the rowid or the same expression as in create_year_index, so SQLite can use the index
+    def year_range(self, first_year, last_year):
+        conditions, parameters = [], []
+        year = self.year
+        if first_year is not None:
+            conditions.append(f"{year} >= ?")
+            parameters.append(first_year)
+        if last_year is not None:
+            conditions.append(f"{year} <= ?")
+            parameters.append(last_year)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), parameters
+
+
+sqlite_sources = {}
+sqlite_sources_lock = threading.Lock()
+
+
+# the open source of a file, opened again if the file was replaced since
+def open_sqlite_source(file_path):
+    key = os.path.abspath(file_path)
+    with sqlite_sources_lock:
+        source = sqlite_sources.get(key)
+        if source is not None and source.identity != SQLiteSource.file_identity(file_path):
+            source.close()
+            source = None
+        if source is None:
+            source = sqlite_sources[key] = SQLiteSource(file_path)
+        return source
+
+
+def close_sqlite_sources():
+    with sqlite_sources_lock:
+        for source in sqlite_sources.values():
+            source.close()
+        sqlite_sources.clear()
+
+
+# warn(title, message) is called for data problems that do not stop the import
+def warn_year_problems(source, warn):
+    unsorted, duplicates = source.year_problems()
+    # check if years are sorted, SQLite returns them sorted anyway
+    if unsorted and warn:
+        warn("Warning: Years Not Sorted",
+             "The years have not been sorted in ascending order. The data will be used anyway and the years will be showed correctly anyways.")
+    # check for duplicate years
+    if duplicates and warn:
+        warn("Warning: Duplicate Years",
+             "The CSV file contains duplicate years. The data will be used anyway, but duplicate years can lead to incorrect evaluations.")
+
+
+def load_sqlite(file_path, warn=None):
+    source = open_sqlite_source(file_path)
+    warn_year_problems(source, warn)
+    df = source.frame()
+    df.rename(columns={col: col.replace("_", " ") for col in df.columns if col != "Jahr"}, inplace=True)
+    return df
+
+
+# API data {year: {energy_source: value, ...}, ...} as DataFrame with the year as column
+def normalize_api_data(api_data):
+    df = pd.DataFrame.from_dict(api_data, orient="index")
+    df.index.name = "Jahr"
+    df.reset_index(inplace=True)
+    # convert year to int
+    df["Jahr"] = pd.to_numeric(df["Jahr"], errors='coerce').fillna(0).astype(int)
+    for col in df.columns[1:]:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+# pick the loader by file extension
+def load_file(file_path, warn=None):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".csv":
+        return load_csv(file_path)
+    if extension == ".json":
+        return load_json(file_path)
+    if extension in (".db", ".sqlite"):
+        return load_sqlite(file_path, warn)
+    raise ValueError(f"Unsupported file format: {file_path}")
+
+
+#--------------Statistics-------------
+# statistics of all energy sources in one vectorized pass, one row per energy source
+def compute_statistics(dataframe):
+    sources = dataframe.columns[1:]
+    matrix = dataframe[sources].to_numpy(dtype=float)
+    years = dataframe["Jahr"].to_numpy()
+    if not len(matrix):
+        return pd.DataFrame(index=sources, columns=STATISTICS_COLUMNS)
+    # compound annual growth rate between the first and the last year
+    first = matrix[years.argmin()]
+    last = matrix[years.argmax()]
+    span = years.max() - years.min()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cagr = np.where((first > 0) & (last >= 0) & (span > 0), (last / first) ** (1 / max(span, 1)) - 1, np.nan)
+    return pd.DataFrame({
+        "min": matrix.min(axis=0),
+        "max": matrix.max(axis=0),
+        "mean": matrix.mean(axis=0),
+        "median": np.median(matrix, axis=0),
+        "std": matrix.std(axis=0, ddof=1) if len(matrix) > 1 else np.full(len(sources), np.nan),
+        "min_year": years[matrix.argmin(axis=0)],
+        "max_year": years[matrix.argmax(axis=0)],
+        "cagr": cagr,
+    }, index=sources)
+
+
+#--------------Country comparison-------------
+COMPARISON_COLUMNS = ["min", "max", "mean", "cagr", "value", "share"]
+
+
+# outer join of several countries on the year, columns are (country, energy source), years missing in a country are NaN
+def align_on_year(frames):
+    indexed = {country: frame.drop_duplicates("Jahr", keep="last").set_index("Jahr") for country, frame in frames.items()}
+    aligned = pd.concat(indexed, axis=1, join="outer").sort_index()
+    aligned.columns.names = ["Land", "Energieträger"]
+    return aligned
+
+
+# share of every energy source in the total of its country, for all years at once
+def shares_by_year(aligned):
+    totals = aligned.T.groupby(level="Land", sort=False).sum(min_count=1).T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = aligned.to_numpy(dtype=float) / totals[aligned.columns.get_level_values("Land")].to_numpy(dtype=float)
+    return pd.DataFrame(shares, index=aligned.index, columns=aligned.columns)
+
+
+# one row per country: statistics of the energy source over all years, its value and share in the selected year
+def compare_countries(aligned, shares, statistics, source, year):
+    rows = {}
+    for country in aligned.columns.get_level_values("Land").unique():
+        row = dict.fromkeys(COMPARISON_COLUMNS, np.nan)
+        country_stats = statistics.get(country)
+        if country_stats is not None and source in country_stats.index:
+            for column in ("min", "max", "mean", "cagr"):
+                row[column] = country_stats.at[source, column]
+        if (country, source) in aligned.columns and year in aligned.index:
+            row["value"] = aligned.at[year, (country, source)]
+            row["share"] = shares.at[year, (country, source)]
+        rows[country] = row
+    return pd.DataFrame.from_dict(rows, orient="index", columns=COMPARISON_COLUMNS)
+
+
+#--------------Columnar disk cache-------------
+CACHE_FORMAT_VERSION = 1
+
+
+def content_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# normalized DataFrames as NumPy .npy files plus metadata, keyed by the content hash of the source file
+class ColumnarDiskCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def prefix(file_path):
+        return os.path.splitext(os.path.basename(file_path))[0].replace(" ", "_") + "-"
+
+    def entry_dir(self, file_path, digest):
+        return os.path.join(self.cache_dir, self.prefix(file_path) + digest[:32])
+
+    # the values are memory-mapped instead of parsed, returns None if there is no valid entry
+    def load(self, file_path, digest):
+        entry = self.entry_dir(file_path, digest)
+        try:
+            with open(os.path.join(entry, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["version"] != CACHE_FORMAT_VERSION or meta["digest"] != digest:
+                return None
+            years = np.load(os.path.join(entry, "years.npy"))
+            values = np.load(os.path.join(entry, "values.npy"), mmap_mode="r")
+            df = pd.DataFrame(values, columns=meta["columns"], copy=False)
+            df.insert(0, "Jahr", years)
+            # columns with another dtype than the shared one of the matrix get their own dtype back
+            for col, dtype in zip(meta["columns"], meta["dtypes"]):
+                if str(df[col].dtype) != dtype:
+                    df[col] = df[col].astype(dtype)
+            return df
+        except (OSError, ValueError, KeyError):
+            return None
+
+    # write into a temporary folder first, so a half written entry is never loaded
+    def store(self, file_path, digest, df):
+        sources = list(df.columns[1:])
+        dtypes = [df[col].dtype for col in sources]
+        if len(set(sources)) != len(sources) or any(dtype.kind not in "iufb" for dtype in dtypes):
+            return False
+        values = df[sources].to_numpy(dtype=np.result_type(*dtypes) if dtypes else np.float64)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            np.save(os.path.join(temp_dir, "years.npy"), df["Jahr"].to_numpy())
+            np.save(os.path.join(temp_dir, "values.npy"), values)
+            meta = {"version": CACHE_FORMAT_VERSION, "digest": digest, "source": file_path,
+                    "columns": sources, "dtypes": [str(dtype) for dtype in dtypes]}
+            with open(os.path.join(temp_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            entry = self.entry_dir(file_path, digest)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(temp_dir, entry)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return False
+        self.remove_old_entries(file_path, digest)
+        return True
+
+    # only the newest content of a source file is kept
+    def remove_old_entries(self, file_path, digest):
+        prefix = self.prefix(file_path)
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and len(name) == len(prefix) + 32 and name != prefix + digest[:32]:
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+
+#--------------Batch mode-------------
+# all data files of the given files and folders, folders are searched recursively
+def collect_files(inputs):
+    files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                files.extend(os.path.join(folder, name) for name in sorted(names)
+                             if name.lower().endswith(DATA_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+# statistics and number of years of a database file, computed by SQLite without loading the table
+def analyze_sqlite(file_path, warn=None):
+    source = open_sqlite_source(file_path)
+    warn_year_problems(source, warn)
+    stats = source.statistics().rename(index=lambda col: col.replace("_", " "))
+    year_count = source.query(f"SELECT COUNT(*) FROM {quote_identifier(source.table)}")[0][0]
+    return stats, year_count
+
+
+# runs in a worker process: load one file and return its report rows
+def analyze_file(file_path):
+    warnings = []
+    try:
+        if file_path.lower().endswith((".db", ".sqlite")):
+            stats, year_count = analyze_sqlite(file_path, warn=lambda title, message: warnings.append(message))
+        else:
+            dataframe = load_file(file_path, warn=lambda title, message: warnings.append(message))
+            stats, year_count = compute_statistics(dataframe), len(dataframe)
+    except Exception as e:
+        return [{"file": file_path, "status": "error", "error": str(e)}]
+    rows = []
+    for source, values in zip(stats.index, stats.to_dict("records")):
+        rows.append({"file": file_path, "status": "ok", "energy_source": source, "years": year_count,
+                     **values, "warnings": " ".join(warnings)})
+    return rows
+
+
+def run_batch(files, workers=None):
+    """Analyze all files in a process pool and return one consolidated report."""
+    rows = []
+    if files:
+        chunksize = max(1, len(files) // ((workers or os.cpu_count() or 1) * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for file_rows in executor.map(analyze_file, files, chunksize=chunksize):
+                rows.extend(file_rows)
+    columns = ["file", "status", "energy_source", "years"] + STATISTICS_COLUMNS + ["warnings", "error"]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def write_report(report, output):
+    if output == "-":
+        report.to_csv(sys.stdout, index=False)
+    elif output.lower().endswith(".json"):
+        report.to_json(output, orient="records", force_ascii=False, indent=2)
+    else:
+        report.to_csv(output, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless statistics report for energiedaten-app data files.")
+    parser.add_argument("inputs", nargs="+", help="data files (.csv, .json, .db, .sqlite) or folders with data files")
+    parser.add_argument("-o", "--output", default="-", help="report file (.csv or .json), '-' prints CSV (default)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--create-index", action="store_true",
+                        help="create an index on the year of every SQLite file before the analysis (writes to the files)")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.inputs)
+    if not files:
+        print("No data files found.", file=sys.stderr)
+        return 1
+    if args.create_index:
+        for file_path in files:
+            if file_path.lower().endswith((".db", ".sqlite")):
+                try:
+                    create_year_index(file_path)
+                except (sqlite3.Error, ValueError) as e:
+                    print(f"Could not create the year index in '{file_path}': {e}", file=sys.stderr)
+    report = run_batch(files, args.workers)
+    write_report(report, args.output)
+    failed = report.loc[report["status"] == "error", ["file", "error"]]
+    for file_path, error in failed.itertuples(index=False):
+        print(f"Error in '{file_path}': {error}", file=sys.stderr)
+    print(f"Processed {len(files)} files, {len(failed)} failed.", file=sys.stderr)
+    return 1 if len(failed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
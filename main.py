@@ -9,17 +9,31 @@
 # Theirs a list of all required modules and how to install them.
 # Version 2.7 LTS (Long Term Support) of the energiedaten-app
 
-import pandas as pd
+import time
+startup_started = time.perf_counter()
+import importlib
 import tkinter as tk
 from tkinter import ttk, messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import sqlite3
 import os
-import requests
-import chardet
-import re
-import datetime
+from concurrent.futures import ThreadPoolExecutor
+import app_logging
+import perf_stats
+import table_view
+import queue
+import threading
+from collections import OrderedDict
+
+# heavy modules are imported by import_heavy_modules after the window is shown
+pd = None  # pandas
+np = None  # numpy
+plt = None  # matplotlib.pyplot
+FigureCanvasTkAgg = None
+NavigationToolbar2Tk = None
+requests = None
+HTTPAdapter = None
+Retry = None
+energy_pipeline = None
+charts = None  # PieChartRenderer and LineChartRenderer
 
 #---------Global variables---------
 base_path = os.path.dirname(os.path.abspath(__file__))
@@ -31,24 +45,51 @@ file_path_gb = r'data/Primärverbrauch GB.db'
 api_url = "http://localhost:8000/api/1/primary_energy_consumption"
 
 #------------Logging-----------
+# lines are written by a background thread, the level can be set with ENERGIEDATEN_LOG_LEVEL (DEBUG, INFO, WARNING, ERROR)
+log_writer = app_logging.AsyncLogWriter(
+    os.path.join(base_path, "logs", "energiedaten-app.log"),
+    level=f"[{os.environ.get('ENERGIEDATEN_LOG_LEVEL', 'INFO').upper()}]",
+    max_bytes=5 * 1024 * 1024,
+    backup_count=5,
+    rotate_interval=7 * 24 * 60 * 60,
+)
+
 def log_message(level, message):
-    log_dir = os.path.join(base_path, "logs")
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    log_path = os.path.join(log_dir, "energiedaten-app.log")
-    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(log_path, "a", encoding="utf-8") as log_file:
-        log_file.write(f"[{now}] {level}: {message}\n")
+    log_writer.log(level, message)
+
+# Tk may only be used from the main thread, calls from worker threads are queued and run by the Tk thread
+ui_queue = queue.Queue()
+
+def run_on_ui(func, *args):
+    if threading.current_thread() is threading.main_thread():
+        func(*args)
+    else:
+        ui_queue.put((func, args))
+
+# a failing callback is logged and skipped, the queue is always drained again
+def process_ui_queue():
+    try:
+        while True:
+            try:
+                func, args = ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args)
+            except Exception as e:
+                log_error(f"Error in UI callback {getattr(func, '__name__', func)}: {str(e)}")
+    finally:
+        root.after(50, process_ui_queue)
 
 # show error, warning or info message in a messagebox graphicaly
 def show_error(title, message):
-    messagebox.showerror(title, message)
+    run_on_ui(messagebox.showerror, title, message)
 
 def show_warning(title, message):
-    messagebox.showwarning(title, message)
+    run_on_ui(messagebox.showwarning, title, message)
 
 def show_info(title, message):
-    messagebox.showinfo(title, message)    
+    run_on_ui(messagebox.showinfo, title, message)    
 
 # only logs the info, error or warning message and does not show it in a messagebox in the GUI 
 def log_info(message):
@@ -60,12 +101,138 @@ def log_warning(message):
 def log_error(message):
     log_message("[ERROR]", f"{message}")        
 
+# data problems that do not stop the import are logged and shown
+def log_and_show_warning(title, message):
+    log_warning(message)
+    show_warning(title, message)
+
 # log startup message in the log file
 log_info ("energiedaten-app started successfully.")
 
+#------------Instrumentation-----------
+# durations of the hot-path stages, percentiles over the last 200 calls per stage
+stage_timer = perf_stats.StageTimer(window=200)
+# ENERGIEDATEN_PROFILE=1 profiles the first country switch, the debug panel can arm it again
+profile_capture = perf_stats.ProfileCapture(os.path.join(base_path, "logs"))
+if os.environ.get("ENERGIEDATEN_PROFILE"):
+    profile_capture.arm()
+
+def log_stage_timings():
+    summary = stage_timer.format_line()
+    if summary:
+        log_info(f"Stage timings: {summary}")
+
 def log_entry_on_close():
     log_message("[INFO]", "energiedaten-app shut down successfully.")
+    load_executor.shutdown(wait=False, cancel_futures=True)
+    compare_executor.shutdown(wait=False, cancel_futures=True)
+    if api_client is not None:
+        api_client.close()
+    if energy_pipeline is not None:
+        energy_pipeline.close_sqlite_sources()
     root.destroy()
+    log_writer.close()
+
+#--------------API client-------------
+# keeps one pooled session open and fetches all pages of the paginated API
+class ApiClient:
+    def __init__(self, url, page_size=100, max_workers=4, timeout=(3.05, 10), retries=3, backoff=0.5):
+        self.url = url
+        self.page_size = page_size
+        self.timeout = timeout  # (connect, read) timeout in seconds
+        self.session = requests.Session()
+        # retry failed connections and server errors with exponential backoff
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=frozenset(["GET"]))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api-client")
+
+    def get_page(self, page, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self.session.get(self.url, params={"page": page, "limit": self.page_size},
+                                    headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        if response.status_code != 200:
+            raise ValueError(f"Error retrieving API data: {response.status_code}")
+        return response
+
+    # first page tells how many pages exist, the remaining pages are fetched concurrently
+    # returns (None, etag) if the data did not change since the given ETag of the first page
+    def fetch_all(self, etag=None):
+        response = self.get_page(1, etag)
+        if response is None:
+            return None, etag
+        first_page = response.json()
+        api_data = dict(first_page.get("data", {}))
+        pages = first_page.get("info", {}).get("pages", 1)
+        for page in self.executor.map(self.get_page, range(2, pages + 1)):
+            api_data.update(page.json().get("data", {}))
+        return api_data, response.headers.get("ETag")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+api_client = None  # created in finish_startup
+
+#--------------DataFrame cache-------------
+# keeps the latest normalized DataFrame per source, keyed by file mtime and size or by the API ETag
+class DataFrameCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()  # source -> (key, dataframe, size in bytes)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key_of(self, source):
+        with self.lock:
+            entry = self.entries.get(source)
+            return entry[0] if entry else None
+
+    def get(self, source, key):
+        with self.lock:
+            entry = self.entries.get(source)
+            if entry is not None and key is not None and entry[0] == key:
+                self.hits += 1
+                self.entries.move_to_end(source)
+                log_info(f"DataFrame cache hit for {source} (hits: {self.hits}, misses: {self.misses})")
+                return entry[1]
+        self.miss(source)
+        return None
+
+    def miss(self, source):
+        with self.lock:
+            self.misses += 1
+            log_info(f"DataFrame cache miss for {source} (hits: {self.hits}, misses: {self.misses})")
+
+    def put(self, source, key, dataframe):
+        if key is None:
+            return
+        size = int(dataframe.memory_usage(deep=True).sum())
+        with self.lock:
+            if source in self.entries:
+                self.size -= self.entries.pop(source)[2]
+            self.entries[source] = (key, dataframe, size)
+            self.size += size
+            # evict least recently used sources until the cache fits again
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                evicted, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+                log_info(f"DataFrame cache evicted {evicted}")
+
+df_cache = DataFrameCache()
+# survives restarts: the normalized DataFrames of the CSV and JSON files as memory-mapped NumPy arrays, created in finish_startup
+disk_cache = None
+
+# cache key of a data file: path, modification time and size
+def file_cache_key(file_path):
+    stat = os.stat(file_path)
+    return (file_path, stat.st_mtime_ns, stat.st_size)
 
 #--------------GUI--------------
 root = tk.Tk()
@@ -92,8 +259,9 @@ if logo_image:
     logo_label = tk.Label(root, image=logo_image, bg="white")
     logo_label.place(relx=0.20, rely=-0.04)
 
-# global variables
-df = pd.DataFrame()
+# global variables, df and df_stats are set when the first country is loaded
+df = None
+df_stats = None  # statistics of every energy source in df, see energy_pipeline.compute_statistics
 country_var = tk.StringVar()
 energy_var = tk.StringVar()
 year_var = tk.StringVar()
@@ -115,6 +283,13 @@ energy_dropdown.grid(row=1, column=1, padx=5, pady=5, sticky="w")
 tk.Label(top_frame, text="Jahr:", font=("Arial", 16), bg="white", fg="black").grid(row=2, column=0, padx=5, pady=5, sticky="w")
 year_dropdown = ttk.Combobox(top_frame, textvariable=year_var, state="readonly", style="TCombobox", font=("Arial", 16))
 year_dropdown.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+# loading state while a country is loaded in the background
+loading_label = tk.Label(top_frame, text="", font=("Arial", 12, "italic"), bg="white", fg="grey")
+loading_label.grid(row=3, column=0, columnspan=2, padx=5, sticky="w")
+# enabled in finish_startup, the comparison needs the modules imported after the first frame
+compare_button = tk.Button(top_frame, text="Länder vergleichen", font=("Arial", 14), state="disabled",
+                           command=lambda: start_comparison())
+compare_button.grid(row=0, column=2, padx=15, pady=5, sticky="w")
 
 # middle frame for statistics and pie chart
 middle_frame = tk.Frame(root, bg="white")
@@ -145,147 +320,244 @@ for i, label in enumerate(["Maximaler Jahresverbrauch", "Durchschn. Jahresverbra
     )
     stat_labels[label].grid(row=i, column=1, padx=10, pady=8, sticky="ew")
 
-#----------------Malware check for CSV file---------------
-def check_csv_for_malicious_code(file_path):
-    suspicious_patterns = [
-        r"^=",  
-        r"@",
-        r"^@",
-        r"cmd", r"powershell", r"shell", r"WScript",
-        r"WEBSERVICE", r"IMPORTXML", r"IMPORTDATA", r"IMPORTHTML", r"IMPORTRANGE", r"HYPERLINK",
-        r"UNICHAR", r"CHAR", r"CONCATENATE", r"EXEC", r"OPEN", r"INCLUDE",
-        r"WMIC", r"-EX", r"CREATE", 
-        r"DROP", r"DELETE", r"ALTER", r"INSERT", r"UPDATE",
-        r"\|", 
-        r"\u202e", 
-        r"\u202d",  
-        r"\u2066", r"\u2067", r"\u2068", r"\u202a", r"\u202b", r"\u202c", r"\u2069",
-    ]
-    try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            for line_num, line in enumerate(f, 1):
-                if any(uc in line for uc in ['\u202e', '\u202d', '\u2066', '\u2067', '\u2068', '\u202a', '\u202b', '\u202c', '\u2069']):
-                    log_warning(f"Suspicious Unicode control characters found in line {line_num} of '{file_path}'.")
-                    show_warning(
-                        "Critical Security Warning!",
-                        f"The CSV file contains suspicious Unicode control characters (e.g. RTL/LTR-Override).\n"
-                        f"Import will be aborted. Check the logs."
-                    )
-                    return False
-                for pattern in suspicious_patterns:
-                    if re.search(pattern, line, re.IGNORECASE):
-                        log_warning(f"Suspicious pattern '{pattern}' found in line {line_num} of '{file_path}'.")
-                        show_warning(
-                            "Critical Security Warning!",
-                            f"The CSV file contains potentially malicious or dangerous code.\n"
-                            f"Import will be aborted.\nDetected pattern: {pattern} Check the logs."
-                        )
-                        return False
-        return True
-    except Exception as e:
-        log_error(f"Critical error during security check of '{file_path}': {str(e)}")
-        show_error("An error occurred during the security check! Please try again. Check the logs", str(e) )
-        return False
-    
 #--------------Loading Data from CSV, JSON, DB and API-------------
-def load_csv_or_json_or_db_or_api():
-    global df
+# runs in a worker thread, returns the loaded DataFrame or None if loading failed
+def read_country_data(selected_country):
     try:
-        selected_country = country_var.get()
+        cache_key = None
+        content_key = None
+        country_files = {"Deutschland": file_path_de, "Frankreich": file_path_fr, "Großbritannien": file_path_gb}
+        if selected_country in country_files:
+            file_path = country_files[selected_country]
+            # the key is taken before reading, so a file changed while reading is loaded again next time
+            cache_key = file_cache_key(file_path)
+            cached_df = df_cache.get(selected_country, cache_key)
+            if cached_df is not None:
+                return cached_df
+            # the disk cache replaces parsing if the file content did not change since it was cached
+            # SQLite files are already a columnar store and their year warnings must be shown on every start
+            if not file_path.lower().endswith((".db", ".sqlite")):
+                content_key = energy_pipeline.content_hash(file_path)
+                with stage_timer.measure("disk cache"):
+                    cached_df = disk_cache.load(file_path, content_key)
+                if cached_df is not None:
+                    log_info(f"Loaded data for {selected_country} from the disk cache.")
+                    df_cache.put(selected_country, cache_key, cached_df)
+                    return cached_df
         if selected_country == "Deutschland":
-            # security check before reading!
-            if not check_csv_for_malicious_code(file_path_de):
-                return
-            # automatically detect encoding
-            with open(file_path_de, 'rb') as f:
-                rawdata = f.read(4096)
-                result = chardet.detect(rawdata)
-                detected_encoding = result['encoding'] if result['encoding'] else 'utf-8'
+            # security check before parsing, the stages are timed by the pipeline
             try:
-                raw_df = pd.read_csv(file_path_de, sep=';', encoding=detected_encoding, skip_blank_lines=True)
-                # remove empty rows 
-                raw_df = raw_df.dropna(how='all')
-            except UnicodeDecodeError:
-                log_error(f"The file '{file_path_de}' could not be read with the detected encoding '{detected_encoding}'.")
+                df = energy_pipeline.load_csv(file_path_de, timer=stage_timer.measure)
+            except energy_pipeline.SecurityCheckError as e:
+                log_text, title, message = energy_pipeline.describe_finding(e.file_path, e.finding)
+                log_warning(log_text)
+                show_warning(title, message)
+                return
+            except UnicodeDecodeError as e:
+                log_error(f"The file '{file_path_de}' could not be read with the detected encoding '{e.encoding}'.")
                 show_error("Error", "The file could not be read with the detected encoding. Check the logs for more details.")
                 return
-            df = raw_df.fillna(0)
-            df = df.set_index(raw_df.columns[0]).T.reset_index()
-            df.rename(columns={df.columns[0]: "Jahr"}, inplace=True)
-            df["Jahr"] = pd.to_numeric(df["Jahr"], errors='coerce').fillna(0).astype(int)
         elif selected_country == "Frankreich":
-            raw_data = pd.read_json(file_path_fr)
-            df = pd.DataFrame(raw_data).T.reset_index()
-            df.rename(columns={"index": "Jahr"}, inplace=True)
-            for col in df.columns[1:]:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+            with stage_timer.measure("read_json"):
+                df = energy_pipeline.load_json(file_path_fr)
         elif selected_country == "Großbritannien":
-            conn = sqlite3.connect(file_path_gb)
-            query = "SELECT * FROM energieverbrauch"
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            df.rename(columns={df.columns[0]: "Jahr"}, inplace=True)
-            df["Jahr"] = pd.to_numeric(df["Jahr"], errors='coerce').fillna(0).astype(int)
-             # round all colums to integers
-            for col in df.columns:
-                if col != "Jahr":
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-            df.rename(columns={col: col.replace("_", " ") for col in df.columns if col != "Jahr"}, inplace=True)        
-            # check if years are sorted and if not round them
-            years = df["Jahr"].tolist()
-            years_sorted = sorted(years)
-            if years != years_sorted:
-                log_warning("The years have not been sorted in ascending order. The data will be used anyway and the years will be showed correctly anyways.")
-                show_warning(
-                    "Warning: Years Not Sorted",
-                    "The years have not been sorted in ascending order. The data will be used anyway and the years will be showed correctly anyways.")
-                df = df.sort_values(by="Jahr").reset_index(drop=True)
-                years = df["Jahr"].tolist()
-            # check for duplicate years
-            if len(years) != len(set(years)):
-                log_warning("The CSV file contains duplicate years. The data will be used anyway, but duplicate years can lead to incorrect evaluations.")
-                show_warning(
-                    "Warning: Duplicate Years",
-                    "The CSV file contains duplicate years. The data will be used anyway, but duplicate years can lead to incorrect evaluations."
-                )
+            # the connection stays open, sorting and the year checks are done by SQLite
+            with stage_timer.measure("read_sqlite"):
+                df = energy_pipeline.load_sqlite(file_path_gb, warn=log_and_show_warning)
         elif selected_country == "Polen":
             log_info(f"Connecting to the API to retrieve data for {selected_country}........")
-            response = requests.get(api_url)
-            if response.status_code == 200:
-                log_info(f"Response Code: {response.status_code} Successfully connected to the API {api_url}")
-                raw_data = response.json()
-                # the actual data is in the "data" key and is a dict: {year: {energy_source: value, ...}, ...}
-                api_data = raw_data.get("data", {})
-                if not api_data:
-                    raise ValueError("The API did not return any data.")
-                # convert to DataFrame: year as column
-                df_api = pd.DataFrame.from_dict(api_data, orient="index")
-                df_api.index.name = "Jahr"
-                df_api.reset_index(inplace=True)
-                # convert year to int
-                df_api["Jahr"] = pd.to_numeric(df_api["Jahr"], errors='coerce').fillna(0).astype(int)
-                for col in df_api.columns[1:]:
-                    df_api[col] = pd.to_numeric(df_api[col], errors='coerce').fillna(0)
-                df = df_api
+            # all pages are collected first: {year: {energy_source: value, ...}, ...}
+            with stage_timer.measure("api fetch"):
+                api_data, cache_key = api_client.fetch_all(df_cache.key_of(selected_country))
+            if api_data is not None:
+                df_cache.miss(selected_country)
             else:
-                raise ValueError(f"Error retrieving API data: {response.status_code}")
+                # 304 Not Modified, the cached DataFrame is still valid
+                cached_df = df_cache.get(selected_country, cache_key)
+                if cached_df is not None:
+                    return cached_df
+                api_data, cache_key = api_client.fetch_all()
+            log_info(f"Successfully retrieved {len(api_data)} years from the API {api_url}")
+            if not api_data:
+                raise ValueError("The API did not return any data.")
+            # convert to DataFrame once for all pages: year as column
+            with stage_timer.measure("normalize"):
+                df = energy_pipeline.normalize_api_data(api_data)
         else:
             log_error(f"Invalid country selection: {selected_country}")
             show_error("Error", "Invalid country selection.")
             return
-        update_dropdowns()
-        display_data()
+        df_cache.put(selected_country, cache_key, df)
+        if content_key is not None:
+            disk_cache.store(country_files[selected_country], content_key, df)
+        return df
     except Exception as e:
         log_error(f"Error loading data for {selected_country}: {str(e)}")
         show_error("Error loading file", str(e))
 
+#--------------Background loading-------------
+# every selection gets a new generation number, results of older selections are discarded
+load_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="loader")
+load_generation = 0
+
+def load_csv_or_json_or_db_or_api():
+    global load_generation
+    load_generation += 1
+    selected_country = country_var.get()
+    loading_label.config(text=f"Lade Daten für {selected_country} ...")
+    root.config(cursor="watch")
+    load_executor.submit(profile_capture.call, load_in_background, load_generation, selected_country)
+
+def load_in_background(generation, selected_country):
+    # a newer selection was made before this load even started
+    if generation != load_generation:
+        return
+    with stage_timer.measure("load"):
+        new_df = read_country_data(selected_country)
+    new_stats = None
+    if new_df is not None:
+        try:
+            with stage_timer.measure("statistics"):
+                new_stats = energy_pipeline.compute_statistics(new_df)
+        except Exception as e:
+            log_error(f"Error calculating statistics for {selected_country}: {str(e)}")
+            new_stats = pd.DataFrame()
+    run_on_ui(finish_interaction, generation, selected_country, new_df, new_stats)
+
+# the Tk part of a country switch, ends an armed profile capture and logs the stage timings
+def finish_interaction(generation, selected_country, new_df, new_stats):
+    profile_capture.call(apply_loaded_data, generation, selected_country, new_df, new_stats)
+    if generation != load_generation:
+        return
+    profile_path = profile_capture.finish(name="country-switch")
+    if profile_path:
+        log_info(f"Profile of the country switch to {selected_country} written to '{profile_path}'.")
+    if new_df is not None:
+        log_stage_timings()
+
+def apply_loaded_data(generation, selected_country, new_df, new_stats):
+    global df, df_stats
+    if generation != load_generation:
+        log_info(f"Discarded stale data for {selected_country}, another country was selected meanwhile.")
+        return
+    loading_label.config(text="")
+    root.config(cursor="")
+    if new_df is None:
+        return
+    df = new_df
+    df_stats = new_stats
+    update_dropdowns()
+    display_data()
+    if "first data" not in startup_times:
+        mark_startup("first data")
+        report_startup_times()
+
+#--------------Country comparison-------------
+# all countries are loaded at the same time, so the comparison takes as long as the slowest source
+compare_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="compare")
+all_countries = ["Deutschland", "Frankreich", "Großbritannien", "Polen"]
+comparison = None  # (aligned DataFrame, shares, {country: statistics}) of the last comparison
+comparison_window = None
+
+def start_comparison():
+    compare_button.config(state="disabled")
+    loading_label.config(text="Lade alle Länder für den Vergleich ...")
+    load_executor.submit(compare_in_background)
+
+def compare_in_background():
+    frames = {}
+    with stage_timer.measure("compare load"):
+        futures = {country: compare_executor.submit(read_country_data, country) for country in all_countries}
+        for country, future in futures.items():
+            country_df = future.result()
+            if country_df is not None:
+                frames[country] = country_df
+            else:
+                log_warning(f"Country comparison without {country}, its data could not be loaded.")
+    result = None
+    try:
+        if frames:
+            with stage_timer.measure("compare align"):
+                aligned = energy_pipeline.align_on_year(frames)
+                statistics = {country: energy_pipeline.compute_statistics(frame) for country, frame in frames.items()}
+                result = (aligned, energy_pipeline.shares_by_year(aligned), statistics)
+    except Exception as e:
+        log_error(f"Error comparing countries: {str(e)}")
+        show_error("Error comparing countries", str(e))
+    run_on_ui(show_comparison, result)
+
+def show_comparison(result):
+    global comparison
+    compare_button.config(state="normal")
+    loading_label.config(text="")
+    if result is None:
+        return
+    comparison = result
+    log_info(f"Compared {len(result[2])} countries: {', '.join(result[2])}.")
+    open_comparison_window()
+
+def open_comparison_window():
+    global comparison_window
+    if comparison_window is not None and comparison_window.winfo_exists():
+        comparison_window.destroy()
+    aligned = comparison[0]
+    comparison_window = tk.Toplevel(root)
+    comparison_window.title("Ländervergleich")
+    comparison_window.config(bg="white")
+    controls = tk.Frame(comparison_window, bg="white")
+    controls.pack(padx=10, pady=10, anchor="w")
+    tk.Label(controls, text="Energieträger:", font=("Arial", 14), bg="white", fg="black").grid(row=0, column=0, padx=5, sticky="w")
+    sources = list(dict.fromkeys(aligned.columns.get_level_values("Energieträger")))
+    source_dropdown = ttk.Combobox(controls, values=sources, state="readonly", font=("Arial", 14))
+    source_dropdown.grid(row=0, column=1, padx=5, sticky="w")
+    tk.Label(controls, text="Jahr:", font=("Arial", 14), bg="white", fg="black").grid(row=1, column=0, padx=5, sticky="w")
+    years = [str(year) for year in aligned.index]
+    compare_year_dropdown = ttk.Combobox(controls, values=years, state="readonly", font=("Arial", 14))
+    compare_year_dropdown.grid(row=1, column=1, padx=5, sticky="w")
+    columns = ["Land", "Minimum", "Maximum", "Durchschnitt", "Wachstum p.a.", "Wert im Jahr", "Anteil im Jahr"]
+    comparison_table = ttk.Treeview(comparison_window, columns=columns, show="headings", height=len(all_countries))
+    for col in columns:
+        comparison_table.heading(col, text=col, anchor="center")
+        comparison_table.column(col, anchor="center", width=150)
+    comparison_table.pack(padx=10, pady=10, fill="both", expand=True)
+
+    def refresh(event=None):
+        try:
+            rows = energy_pipeline.compare_countries(*comparison, source_dropdown.get(), int(compare_year_dropdown.get()))
+            comparison_table.delete(*comparison_table.get_children())
+            for country, row in rows.iterrows():
+                comparison_table.insert("", "end", values=[
+                    country,
+                    format_value(row["min"], "{:.2f} PJ"),
+                    format_value(row["max"], "{:.2f} PJ"),
+                    format_value(row["mean"], "{:.2f} PJ"),
+                    format_value(row["cagr"] * 100, "{:+.2f} %"),
+                    format_value(row["value"], "{:.2f} PJ"),
+                    format_value(row["share"] * 100, "{:.1f} %"),
+                ])
+        except Exception as e:
+            log_error(f"Error updating country comparison: {str(e)}")
+            show_error("Error updating country comparison", str(e))
+
+    # start with the energy source and year selected in the main window
+    source_dropdown.current(sources.index(energy_var.get()) if energy_var.get() in sources else 0)
+    compare_year_dropdown.current(years.index(year_var.get()) if year_var.get() in years else len(years) - 1)
+    source_dropdown.bind("<<ComboboxSelected>>", refresh)
+    compare_year_dropdown.bind("<<ComboboxSelected>>", refresh)
+    refresh()
+
+# missing values (country without this energy source or year) are shown as "-"
+def format_value(value, template):
+    return "-" if pd.isna(value) else template.format(value)
+
 #--------------Update dropdown menu----------------
 def update_dropdowns():
     try:
         energy_sources = [col for col in df.columns if col != "Jahr"]
         energy_dropdown['values'] = energy_sources
         energy_dropdown.current(0)
-        energy_dropdown.bind("<<ComboboxSelected>>", lambda e: display_data())
+        # the table and the pie chart do not depend on the energy source, only the statistics and the line chart are updated
+        energy_dropdown.bind("<<ComboboxSelected>>", lambda e: on_energy_selected())
         years = df["Jahr"].astype(str).tolist()
         year_dropdown['values'] = years
         year_dropdown.current(0)
@@ -295,60 +567,82 @@ def update_dropdowns():
         show_error("Error updating dropdown menus", str(e),"Check the logs.")
 
 #---------------Pie chart-----------------
-fig, ax = plt.subplots(figsize=(5, 4))
-canvas = FigureCanvasTkAgg(fig, master=middle_frame)
-canvas.get_tk_widget().grid(row=0, column=2, rowspan=3, padx=20, pady=10)
+# the figure is created in finish_startup, after matplotlib was imported
+fig, ax, canvas = None, None, None
 
 # label for "Keine Werte verfügbar"
 no_data_label = tk.Label(middle_frame, text="Keine Werte verfügbar", font=("Arial", 16), fg="red", bg="white")
 no_data_label.grid(row=3, column=2, pady=10)
 no_data_label.grid_remove()
 
+pie_renderer = None  # charts.PieChartRenderer, created in finish_startup
+
 # update values in pie chart
 def update_pie_chart():
     try:
         selected_year = year_var.get()
-        selected_row = df[df["Jahr"] == int(selected_year)]
-        if selected_row.empty:
-            log_error(f"No data available for the selected year: {selected_year}")
-            show_error("Error", "No data available for the selected year.")
-            return
-        # all columns except "Year"
-        energy_data = selected_row.iloc[0, 1:]  
-        ax.clear()
-
-        if energy_data.sum() == 0:
-            wedges, texts = ax.pie([1], colors=["lightgrey"])
-            ax.text(0, 0, "No values\navailable", ha='center', va='center', fontsize=16, color="red")
-        else:
-            # Filter out zero values and dont label and display them
-            values = energy_data.values
-            labels = [label if value > 0 else '' for label, value in zip(energy_data.index, values)]
-            colors = plt.cm.tab20.colors
-            # Draw pie chart
-            explode = [0.01] * len(values)
-            wedges, texts, autotexts = ax.pie(
-                values,
-                labels=labels,
-                autopct=lambda pct: f'{pct:.1f}%' if pct > 0 else '',
-                explode=explode,
-                shadow=True,
-                startangle=90,
-                labeldistance=1.15,
-                pctdistance=0.85,
-                colors=colors[:len(values)]
-            )
-            for text in texts:
-                text.set_fontsize(12)
-            for autotext in autotexts:
-                autotext.set_fontsize(11)
-                autotext.set_color("black")
-                autotext.set_bbox(dict(facecolor='white', edgecolor='none', boxstyle='round,pad=0.2', alpha=0.7))
-        canvas.draw()
+        pie_renderer.reset(country_var.get(), df)
+        key = (country_var.get(), selected_year)
+        if not pie_renderer.is_cached(key):
+            selected_row = df[df["Jahr"] == int(selected_year)]
+            if selected_row.empty:
+                log_error(f"No data available for the selected year: {selected_year}")
+                show_error("Error", "No data available for the selected year.")
+                return
+            # all columns except "Year"
+            energy_data = selected_row.iloc[0, 1:]  
+            pie_renderer.store(key, energy_data)
+        with stage_timer.measure("chart update"):
+            pie_renderer.show(key)
     except Exception as e:
         log_error(f"Error updating pie chart: {str(e)}, access denied. No data available for the selected year.")   
         show_error("Error updating pie chart", str(e), "Check the logs")
 
+#---------------Line chart-----------------
+# one energy source or several selected sources over all years, next to the pie chart
+# the figure is created in finish_startup like the pie chart
+line_fig, line_ax, line_canvas, line_toolbar = None, None, None, None
+line_frame = tk.Frame(middle_frame, bg="white")
+line_frame.grid(row=0, column=3, rowspan=4, padx=20, pady=10, sticky="n")
+line_toolbar_frame = tk.Frame(line_frame, bg="white")
+# several sources can be compared with Ctrl/Shift click
+tk.Label(line_frame, text="Vergleich:", font=("Arial", 12), bg="white", fg="black").grid(row=2, column=0, sticky="w")
+line_sources_listbox = tk.Listbox(line_frame, selectmode="extended", height=5, exportselection=False, font=("Arial", 12))
+line_sources_listbox.grid(row=3, column=0, sticky="ew")
+
+line_renderer = None  # charts.LineChartRenderer, created in finish_startup
+
+# fill the source list of a new dataset and select the energy source of the dropdown
+def update_line_sources():
+    line_sources_listbox.delete(0, tk.END)
+    for source in df.columns[1:]:
+        line_sources_listbox.insert(tk.END, source)
+    select_line_source(energy_var.get())
+
+def select_line_source(source):
+    sources = list(line_sources_listbox.get(0, tk.END))
+    line_sources_listbox.selection_clear(0, tk.END)
+    if source in sources:
+        line_sources_listbox.selection_set(sources.index(source))
+        line_sources_listbox.see(sources.index(source))
+
+def update_line_chart():
+    try:
+        line_renderer.reset(df)
+        sources = [line_sources_listbox.get(index) for index in line_sources_listbox.curselection()]
+        with stage_timer.measure("line chart"):
+            line_renderer.show(sources)
+    except Exception as e:
+        log_error(f"Error updating line chart: {str(e)}")
+        show_error("Error updating line chart", str(e))
+
+def on_energy_selected():
+    update_statistics()
+    select_line_source(energy_var.get())
+    update_line_chart()
+
+line_sources_listbox.bind("<<ListboxSelect>>", lambda e: update_line_chart())
+
 #------------------Table------------------
 table_frame = tk.Frame(root, bg="white", bd=1, relief="solid")
 table_frame.pack(padx=10, pady=10)
@@ -375,28 +669,70 @@ scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=table.yview)
 scrollbar.pack(side="right", fill="y")
 table.configure(yscrollcommand=scrollbar.set)
 
+#------------------Virtual table------------------
+# from table_view.VIRTUAL_TABLE_THRESHOLD rows on only the visible rows are put into the table
+virtual_table = table_view.VirtualTable(table, scrollbar, int(table.cget("height")))
+for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+    table.bind(sequence, virtual_table.on_mousewheel)
+
+#------------------Sort permutations------------------
+# argsort permutation per column, computed on the first click and kept until the dataset changes
+class SortPermutations:
+    def __init__(self):
+        self.dataframe = None
+        self.permutations = {}
+
+    def reset(self, dataframe):
+        if dataframe is not self.dataframe:
+            self.dataframe = dataframe
+            self.permutations = {}
+
+    def get(self, column, reverse):
+        if column not in self.permutations:
+            self.permutations[column] = np.argsort(self.dataframe[column].to_numpy(), kind="stable")
+        order = self.permutations[column]
+        return order[::-1] if reverse else order
+
+sort_permutations = SortPermutations()
+
+# fill the table with all rows, or with the visible window only for large datasets
+def fill_table(dataframe):
+    sort_permutations.reset(dataframe)
+    table_view.fill_treeview(table, virtual_table, dataframe.to_numpy())
+
+# show the rows in the given order by moving the existing items, nothing is sorted or inserted again
+def apply_table_order(order):
+    if virtual_table.active:
+        virtual_table.set_order(order)
+        return
+    for position, row in enumerate(order):
+        item = str(row)
+        table.move(item, "", position)
+        table.item(item, tags=("even" if position % 2 == 0 else "odd",))
+
 # sort table by column
 def sort_table(column, reverse):
     try:
         if column == "Jahr" or column in df.columns[1:]:
-            sorted_df = df.sort_values(by=column, ascending=not reverse)
-            update_table(sorted_df)
+            apply_table_order(sort_permutations.get(column, reverse))
             table.heading(column, command=lambda: sort_table(column, not reverse))
     except Exception as e:
         log_error(f"Error sorting table by {column}: {str(e)}")
         show_error("Error sorting table", str(e), "Check the logs")
 
-# update table
-def update_table(dataframe):
+#--------------Statistics labels--------------
+# the statistics are calculated once after loading, the labels only look them up
+def update_statistics():
     try:
-        table.delete(*table.get_children())
-        for i, (_, row) in enumerate(dataframe.iterrows()):
-            values = [row["Jahr"]] + list(row[1:])
-            tag = "even" if i % 2 == 0 else "odd"
-            table.insert("", "end", values=values, tags=(tag,))
+        selected_energy = energy_var.get()
+        if selected_energy and selected_energy in df_stats.index:
+            stats = df_stats.loc[selected_energy]
+            stat_labels["Maximaler Jahresverbrauch"].config(text=f"{stats['max']:.2f} PJ")
+            stat_labels["Durchschn. Jahresverbrauch"].config(text=f"{stats['mean']:.2f} PJ")
+            stat_labels["Minimaler Jahresverbrauch"].config(text=f"{stats['min']:.2f} PJ")
     except Exception as e:
-        log_error(f"Error updating table: {str(e)} access denied" )
-        show_error("Error updating table", str(e), "Check the logs")
+        log_error(f"Error updating statistics: {str(e)}")
+        show_error("Error updating statistics", str(e))
 
 #--------------Display data in table and calculate statistics--------------
 def display_data():
@@ -415,35 +751,156 @@ def display_data():
             table.heading(col, text=col, anchor="center", command=lambda c=col: sort_table(c, False))
             table.column(col, anchor="center", width=170)
 
-        # paint table line white and grey alternatively
-        for i, (_, row) in enumerate(df.iterrows()):
-            values = [row["Jahr"]] + list(row[1:])
-            tag = "even" if i % 2 == 0 else "odd"
-            table.insert("", "end", values=values, tags=(tag,))
+        with stage_timer.measure("table fill"):
+            fill_table(df)
 
         table.tag_configure("even", background="white")
         table.tag_configure("odd", background="lightgrey")
-        #--------calculate average, max and min values----------
-        selected_energy = energy_var.get()
-        if selected_energy and selected_energy in df.columns:
-            max_value = df[selected_energy].max()
-            mean_value = df[selected_energy].mean()
-            min_value = df[selected_energy].min()
-            stat_labels["Maximaler Jahresverbrauch"].config(text=f"{max_value:.2f} PJ")
-            stat_labels["Durchschn. Jahresverbrauch"].config(text=f"{mean_value:.2f} PJ")
-            stat_labels["Minimaler Jahresverbrauch"].config(text=f"{min_value:.2f} PJ")
+        update_statistics()
 
         # update pie chart based on selected year
         update_pie_chart()
+        update_line_sources()
+        update_line_chart()
     except Exception as e:
         log_error(f"Error displaying data for {selected_country}: {str(e)}. Data can't be displayed by the function.")
         show_error("Error displaying data", str(e), "Check the logs")
 
+#--------------Debug panel--------------
+# F12 opens a window with the rolling stage timings, ENERGIEDATEN_DEBUG_PANEL=1 opens it at startup
+debug_window = None
+
+# draw_idle renders later in an idle callback, so the real drawing time is measured in draw itself
+def time_canvas_draw(figure_canvas, stage="chart draw"):
+    draw = figure_canvas.draw
+    def timed_draw():
+        with stage_timer.measure(stage):
+            draw()
+    figure_canvas.draw = timed_draw
+
+def open_debug_panel(event=None):
+    global debug_window
+    if debug_window is not None and debug_window.winfo_exists():
+        debug_window.lift()
+        return
+    debug_window = tk.Toplevel(root)
+    debug_window.title("Debug: Laufzeiten")
+    debug_window.config(bg="white")
+    timings_label = tk.Label(debug_window, text="", font=("Courier", 11), justify="left", anchor="nw", bg="white", fg="black")
+    timings_label.pack(padx=10, pady=10, fill="both", expand=True)
+    profile_label = tk.Label(debug_window, text="", font=("Arial", 11, "italic"), bg="white", fg="grey")
+    profile_label.pack(padx=10, anchor="w")
+    tk.Button(debug_window, text="Nächsten Länderwechsel profilieren", font=("Arial", 12),
+              command=profile_capture.arm).pack(padx=10, pady=10, anchor="w")
+
+    def refresh():
+        if not debug_window.winfo_exists():
+            return
+        timings_label.config(text=stage_timer.format_table() or "Noch keine Messungen.")
+        profile_label.config(text="Profiler aktiv für den nächsten Länderwechsel." if profile_capture.armed else "")
+        debug_window.after(1000, refresh)
+
+    refresh()
+
+root.bind("<F12>", open_debug_panel)
+
+#--------------Startup--------------
+# the window is shown first, heavy imports and the first data load follow after the first frame
+startup_times = {}  # stage -> seconds since the start of main.py
+import_times = {}  # module -> seconds needed for the import
+
+def mark_startup(stage):
+    startup_times[stage] = time.perf_counter() - startup_started
+
+def timed_import(module_name):
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_times[module_name] = time.perf_counter() - started
+    return module
+
+def import_heavy_modules():
+    global pd, np, plt, FigureCanvasTkAgg, NavigationToolbar2Tk, requests, HTTPAdapter, Retry, energy_pipeline, charts
+    pd = timed_import("pandas")
+    np = timed_import("numpy")
+    plt = timed_import("matplotlib.pyplot")
+    backend_tkagg = timed_import("matplotlib.backends.backend_tkagg")
+    FigureCanvasTkAgg = backend_tkagg.FigureCanvasTkAgg
+    NavigationToolbar2Tk = backend_tkagg.NavigationToolbar2Tk
+    requests = timed_import("requests")
+    HTTPAdapter = timed_import("requests.adapters").HTTPAdapter
+    Retry = timed_import("urllib3.util.retry").Retry
+    energy_pipeline = timed_import("energy_pipeline")
+    charts = timed_import("charts")
+
+# startup timing in the log, also printed if ENERGIEDATEN_STARTUP_REPORT is set
+def report_startup_times():
+    stages = [f"{stage}: {seconds * 1000:.0f} ms" for stage, seconds in startup_times.items()]
+    imports = [f"{module}: {seconds * 1000:.0f} ms" for module, seconds in import_times.items()]
+    log_info(f"Startup timing: {', '.join(stages)}. Imports: {', '.join(imports)}.")
+    if os.environ.get("ENERGIEDATEN_STARTUP_REPORT"):
+        print("Startup timing (since start of main.py):")
+        for line in stages:
+            print(f"  {line}")
+        print("Imports:")
+        for line in imports:
+            print(f"  {line}")
+
+def on_first_paint():
+    mark_startup("first paint")
+    loading_label.config(text="Lade Module ...")
+    load_executor.submit(import_in_background)
+
+# imports run on a worker thread, the Tk objects are created on the Tk thread afterwards
+def import_in_background():
+    try:
+        import_heavy_modules()
+        mark_startup("imports done")
+        run_on_ui(finish_startup)
+    except Exception as e:
+        log_error(f"Error importing required modules: {str(e)}")
+        show_error("Error importing required modules", str(e))
+
+def create_line_chart():
+    global line_fig, line_ax, line_canvas, line_toolbar, line_renderer
+    line_fig, line_ax = plt.subplots(figsize=(6, 4))
+    line_ax.set_xlabel("Jahr")
+    line_ax.set_ylabel("PJ")
+    line_ax.grid(True, alpha=0.3)
+    line_canvas = FigureCanvasTkAgg(line_fig, master=line_frame)
+    time_canvas_draw(line_canvas, "line chart draw")
+    line_canvas.get_tk_widget().grid(row=0, column=0)
+    # zoom and pan with the matplotlib toolbar
+    line_toolbar = NavigationToolbar2Tk(line_canvas, line_toolbar_frame, pack_toolbar=False)
+    line_toolbar.pack(side="left")
+    line_toolbar_frame.grid(row=1, column=0, sticky="w")
+    line_renderer = charts.LineChartRenderer(line_ax, line_canvas)
+    # a new size of the window means a new pixel width
+    line_canvas.mpl_connect("resize_event", lambda event: line_renderer.refresh())
+
+def finish_startup():
+    global api_client, disk_cache, fig, ax, canvas, pie_renderer
+    api_client = ApiClient(api_url)
+    disk_cache = energy_pipeline.ColumnarDiskCache(os.path.join(base_path, "cache"))
+    fig, ax = plt.subplots(figsize=(5, 4))
+    canvas = FigureCanvasTkAgg(fig, master=middle_frame)
+    time_canvas_draw(canvas)
+    canvas.get_tk_widget().grid(row=0, column=2, rowspan=3, padx=20, pady=10)
+    pie_renderer = charts.PieChartRenderer(ax, canvas)
+    create_line_chart()
+    compare_button.config(state="normal")
+    mark_startup("startup done")
+    # a country can only be selected once everything for loading exists
+    country_dropdown.bind("<<ComboboxSelected>>", lambda e: load_csv_or_json_or_db_or_api())
+    load_csv_or_json_or_db_or_api()
+
 # update dropdowns and load initial data
-country_dropdown['values'] = ["Deutschland", "Frankreich", "Großbritannien", "Polen"]
-country_dropdown.bind("<<ComboboxSelected>>", lambda e: load_csv_or_json_or_db_or_api())
+country_dropdown['values'] = all_countries
 country_dropdown.current(0)
-load_csv_or_json_or_db_or_api()
+process_ui_queue()
+# idle callbacks run after the pending redraws of the widgets, so this marks the first painted frame
+root.after_idle(on_first_paint)
+if os.environ.get("ENERGIEDATEN_DEBUG_PANEL"):
+    open_debug_panel()
 # log entry when the application is closed
 root.protocol("WM_DELETE_WINDOW", log_entry_on_close)
 #--------------Main loop--------------
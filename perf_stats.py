@@ -0,0 +1,114 @@
+# Timing instrumentation for the hot paths of the energiedaten-app.
+# Every stage keeps the durations of its last calls in memory, percentiles are computed from this rolling window.
+# A single interaction can be profiled with cProfile, the result is written as .prof file and as text summary.
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PERCENTILES = (50, 90, 99)
+
+
+# nearest-rank percentile of an already sorted list
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class StageTimer:
+    def __init__(self, window=200):
+        self.window = window  # number of durations kept per stage
+        self.durations = {}  # stage -> deque of seconds
+        self.lock = threading.Lock()  # stages are measured on the Tk thread and on the loader threads
+
+    @contextmanager
+    def measure(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def record(self, stage, seconds):
+        with self.lock:
+            if stage not in self.durations:
+                self.durations[stage] = deque(maxlen=self.window)
+            self.durations[stage].append(seconds)
+
+    # {stage: {"count": n, "last": s, "p50": s, "p90": s, "p99": s}, ...} in the order the stages were first measured
+    def summary(self):
+        with self.lock:
+            snapshot = {stage: list(durations) for stage, durations in self.durations.items()}
+        result = {}
+        for stage, durations in snapshot.items():
+            ordered = sorted(durations)
+            row = {"count": len(durations), "last": durations[-1]}
+            for percent in PERCENTILES:
+                row[f"p{percent}"] = percentile(ordered, percent)
+            result[stage] = row
+        return result
+
+    # one aligned line per stage in milliseconds for the debug panel
+    def format_table(self):
+        lines = []
+        for stage, row in self.summary().items():
+            values = "  ".join(f"p{percent} {row[f'p{percent}'] * 1000:7.1f}" for percent in PERCENTILES)
+            lines.append(f"{stage:<14} n={row['count']:<4} last {row['last'] * 1000:7.1f}  {values} ms")
+        return "\n".join(lines)
+
+    # all stages in one line for the log
+    def format_line(self):
+        names = "/".join(f"p{percent}" for percent in PERCENTILES)
+        entries = []
+        for stage, row in self.summary().items():
+            values = "/".join(f"{row[f'p{percent}'] * 1000:.1f}" for percent in PERCENTILES)
+            entries.append(f"{stage} {names} {values} ms (n={row['count']})")
+        return "; ".join(entries)
+
+
+# cProfile capture of one interaction, which may run on several threads one after another
+class ProfileCapture:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.profile = None
+        self.lock = threading.Lock()
+
+    def arm(self):
+        self.profile = cProfile.Profile()
+
+    @property
+    def armed(self):
+        return self.profile is not None
+
+    # profile one call if a capture is armed, otherwise just run it
+    def call(self, func, *args):
+        profile = self.profile
+        # only one profiler can be active, a call overlapping a profiled one runs without profiling
+        if profile is None or not self.lock.acquire(blocking=False):
+            return func(*args)
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            self.lock.release()
+
+    # write the capture and disarm, returns the path of the .prof file or None if nothing was armed
+    def finish(self, name="interaction", limit=30):
+        profile, self.profile = self.profile, None
+        if profile is None:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"profile-{name}-{stamp}.prof")
+        profile.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(limit)
+        with open(path[:-len(".prof")] + ".txt", "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        return path
@@ -0,0 +1,134 @@
+# Synthetic data files in the formats of the energiedaten-app for benchmarks.
+# The files look like the ones in the data folder, only with many more years:
+#     python synthetic_data.py --years 1000 100000 --output bench_data
+# With --errors the same kind of faults as in the error files of the data folder are added:
+# empty cells, numbers with spaces or as text, years out of order, NULL values and missing energy sources.
+
+import argparse
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+SOURCES = ["Steinkohle", "Braunkohle", "Mineralöle", "Gase", "Erneuerbare Energien", "Sonstige Energieträger", "Kernenergie"]
+FIRST_YEAR = 1
+ERROR_RATE = 0.001  # share of faulty values in the error variants, at least one of every kind
+SEED = 1905
+FORMATS = ("csv", "json", "sqlite")
+
+
+# years and one random walk per energy source, the same seed gives the same data on every run
+def generate_values(years, seed=SEED):
+    rng = np.random.default_rng(seed)
+    start = rng.integers(100, 10000, size=len(SOURCES))
+    steps = rng.integers(-50, 51, size=(years, len(SOURCES)))
+    values = np.maximum(start + np.cumsum(steps, axis=0), 0)
+    return np.arange(FIRST_YEAR, FIRST_YEAR + years), values
+
+
+# positions of the faulty values, sorted
+def error_positions(rng, count):
+    amount = min(count, max(1, int(count * ERROR_RATE)))
+    return np.sort(rng.choice(count, size=amount, replace=False))
+
+
+# one energy source per row and one column per year, like "Primärverbrauch DE.csv"
+def write_csv(path, years, values, errors=False, seed=SEED):
+    rng = np.random.default_rng(seed)
+    header = [str(year) for year in years]
+    if errors and len(years) > 1:
+        # two neighbouring years swapped, like 2004;2003 in "Primärverbrauch DE Fehler.csv"
+        position = int(rng.integers(0, len(years) - 1))
+        header[position], header[position + 1] = header[position + 1], header[position]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("Energieträger;" + ";".join(header) + "\n")
+        for column, source in enumerate(SOURCES):
+            cells = values[:, column].astype(str).tolist()
+            if errors:
+                for position in error_positions(rng, len(cells)):
+                    cells[position] = "" if rng.random() < 0.5 else " " + cells[position]
+            f.write(source + ";" + ";".join(cells) + "\n")
+
+
+# {year: {energy_source: value, ...}, ...} written year by year, like "Primärverbrauch FR.json"
+def write_json(path, years, values, errors=False, seed=SEED):
+    rng = np.random.default_rng(seed)
+    faulty = set(error_positions(rng, len(years)).tolist()) if errors else set()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        for position, (year, row) in enumerate(zip(years.tolist(), values.tolist())):
+            entry = dict(zip(SOURCES, row))
+            if position in faulty:
+                # numbers as text like in "Primärverbrauch mehr Daten und Fehler.json", or a missing energy source
+                source = SOURCES[int(rng.integers(0, len(SOURCES)))]
+                if rng.random() < 0.5:
+                    entry[source] = str(entry[source])
+                else:
+                    del entry[source]
+            body = json.dumps(entry, ensure_ascii=False, indent=4).replace("\n}", "\n  }")
+            separator = ",\n" if position < len(years) - 1 else "\n"
+            f.write(f'  "{year}": {body}{separator}')
+        f.write("}\n")
+
+
+# table "energieverbrauch" with one row per year, like "Primärverbrauch GB.db"
+def write_sqlite(path, years, values, errors=False, seed=SEED, batch_size=100000):
+    rng = np.random.default_rng(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    columns = [source.replace(" ", "_") for source in SOURCES]
+    rows = values.astype(object)
+    if errors:
+        # NULL and empty text like in "Primärverbrauch GB (mit Fehlern).db"
+        for position in error_positions(rng, len(years)):
+            rows[position, int(rng.integers(0, len(SOURCES)))] = None if rng.random() < 0.5 else ""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(f"CREATE TABLE energieverbrauch (Jahr INTEGER PRIMARY KEY, "
+                     f"{', '.join(column + ' INTEGER' for column in columns)})")
+        insert = f"INSERT INTO energieverbrauch VALUES ({', '.join('?' * (len(columns) + 1))})"
+        for start in range(0, len(years), batch_size):
+            conn.executemany(insert, ([int(year)] + row for year, row in
+                                      zip(years[start:start + batch_size], rows[start:start + batch_size].tolist())))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+WRITERS = {"csv": write_csv, "json": write_json, "sqlite": write_sqlite}
+EXTENSIONS = {"csv": ".csv", "json": ".json", "sqlite": ".db"}
+
+
+def file_name(file_format, years, errors=False):
+    return f"synthetic_{years}{'_errors' if errors else ''}{EXTENSIONS[file_format]}"
+
+
+# writes every format and size into output_dir, returns {(format, years, errors): path}
+def generate(output_dir, sizes, formats=FORMATS, errors=False, seed=SEED):
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for size in sizes:
+        years, values = generate_values(size, seed)
+        for file_format in formats:
+            for variant in ((False, True) if errors else (False,)):
+                path = os.path.join(output_dir, file_name(file_format, size, variant))
+                WRITERS[file_format](path, years, values, variant, seed)
+                paths[(file_format, size, variant)] = path
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic data files of the energiedaten-app.")
+    parser.add_argument("--years", nargs="+", type=int, default=[1000, 100000], help="number of years per file, 10^3 to 10^7")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--errors", action="store_true", help="also write the variants with faulty values")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default="bench_data", help="output folder")
+    args = parser.parse_args(argv)
+    for (file_format, size, errors), path in generate(args.output, args.years, args.formats, args.errors, args.seed).items():
+        print(f"{path}: {size} years, {file_format}{' with errors' if errors else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Treeview filling of the energiedaten-app table. The Treeview is passed in, so it also works without the main window.
+# Small datasets get one Treeview item per row, large ones a fixed window of items that is refilled when scrolling.
+
+VIRTUAL_TABLE_THRESHOLD = 1000  # from this number of rows on only the visible rows are put into the table
+
+
+# shows a window of a NumPy array in a fixed set of Treeview items, scrolling only changes their values
+class VirtualTable:
+    def __init__(self, tree, tree_scrollbar, visible_rows):
+        self.tree = tree
+        self.scrollbar = tree_scrollbar
+        self.visible_rows = visible_rows
+        self.rows = []
+        self.order = []  # row positions in display order
+        self.offset = 0
+        self.items = []
+        self.active = False
+
+    def load(self, rows):
+        self.rows = rows
+        self.order = range(len(rows))  # NumPy accepts a range as index like an array
+        self.offset = 0
+        self.tree.delete(*self.tree.get_children())
+        self.items = [self.tree.insert("", "end", values=()) for _ in range(min(self.visible_rows, len(rows)))]
+        # the scrollbar now moves the window instead of the Treeview
+        self.tree.configure(yscrollcommand="")
+        self.scrollbar.configure(command=self.yview)
+        self.active = True
+        self.refresh()
+
+    def set_order(self, order):
+        self.order = order
+        self.offset = 0
+        self.refresh()
+
+    def deactivate(self):
+        if self.active:
+            self.active = False
+            self.items = []
+            self.scrollbar.configure(command=self.tree.yview)
+            self.tree.configure(yscrollcommand=self.scrollbar.set)
+
+    # write the rows of the current window into the existing items, costs the same for every dataset size
+    def refresh(self):
+        window = self.order[self.offset:self.offset + len(self.items)]
+        for i, (item, row) in enumerate(zip(self.items, self.rows[window])):
+            tag = "even" if (self.offset + i) % 2 == 0 else "odd"
+            self.tree.item(item, values=list(row), tags=(tag,))
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(self.items)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.rows) - len(self.items)))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    # same arguments as Treeview.yview: ("moveto", fraction) or ("scroll", number, "units"/"pages")
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= len(self.items)
+            self.scroll_to(self.offset + amount)
+
+    def on_mousewheel(self, event):
+        if not self.active:
+            return None
+        step = -3 if event.num == 4 or event.delta > 0 else 3
+        self.scroll_to(self.offset + step)
+        return "break"
+
+
+# fill the Treeview with all rows, or with the visible window only for large datasets
+def fill_treeview(tree, virtual_table, rows):
+    if len(rows) >= VIRTUAL_TABLE_THRESHOLD:
+        virtual_table.load(rows)
+        return
+    virtual_table.deactivate()
+    tree.delete(*tree.get_children())
+    # paint table line white and grey alternatively
+    for i, values in enumerate(rows):
+        tag = "even" if i % 2 == 0 else "odd"
+        # the row position is the item id, so sorting can move the existing items
+        tree.insert("", "end", iid=str(i), values=list(values), tags=(tag,))